@@ -0,0 +1,113 @@
+"""Throughput of parse_climbing_lines against the previous regex-based parser.
+
+Builds a synthetic in-memory corpus of climbing logs (both footer variants)
+and times each parser over it, so disk I/O does not dominate the numbers.
+
+    python benchmarks/parser_benchmark.py --logs 100000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_json_file import parse_climbing_lines
+
+
+def legacy_parse_climbing_lines(file):
+    # parse_climbing_log as it was before the single-pass parser
+    lines = [line.strip() for line in file if line.strip()]
+
+    date_str = lines[0]
+    date = datetime.strptime(date_str, "%B %d, %Y at %I:%M %p")
+
+    climb_type = lines[1]
+
+    attempted = []
+    climbed = []
+
+    for line in lines[2:]:
+        if line.startswith("Max:") or line.startswith("Pinnacle Climb Log"):
+            break
+        if ':' in line:
+            grade, emojis = line.split(':')
+            grade = grade.strip()
+            green_count = emojis.count('🟢')
+            yellow_count = emojis.count('🟡')
+
+            climbed.extend([grade] * green_count)
+            attempted.extend([grade] * yellow_count)
+
+    content = ' '.join(lines)
+
+    time_match = re.search(r'(\d+)h (\d+)m', content)
+    total_minutes = 0
+    if time_match:
+        hours, minutes = map(int, time_match.groups())
+        total_minutes = hours * 60 + minutes
+
+    cal_match = re.search(r'([\d,]+) Cal', content)
+    calories = 0
+    if cal_match:
+        calories = int(cal_match.group(1).replace(',', ''))
+
+    return {
+        "type": climb_type,
+        "date": date.isoformat(),
+        "time": total_minutes,
+        "cal": calories,
+        "attempted": attempted,
+        "climbed": climbed
+    }
+
+
+def synthetic_log(rng, when):
+    lines = [when.strftime("%B %-d, %Y at %-I:%M %p"), "Boulder"]
+    for grade in range(rng.randint(1, 3), rng.randint(5, 9)):
+        marks = '🟢' * rng.randint(1, 12) + '🟡' * rng.randint(0, 5)
+        lines.append(f"V{grade}: {marks}")
+    lines += ["", "Max: V8", "", "Pinnacle Climb Log -", "", "Time"]
+    if rng.random() < 0.5:
+        lines += [f"{rng.randint(1, 2)}h {rng.randint(0, 59)}m", "Cal", f"{rng.randint(300, 1500):,} Cal"]
+    else:
+        lines += [f"{rng.randint(10, 59)}m {rng.randint(0, 59)}s", "Elev Gain", "0 ft"]
+    return [line + "\n" for line in lines]
+
+
+def build_corpus(count, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1, 18, 0)
+    return [synthetic_log(rng, start + timedelta(hours=6 * i)) for i in range(count)]
+
+
+def time_parser(parse, corpus):
+    started = time.perf_counter()
+    for log in corpus:
+        parse(log)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare climbing log parser throughput")
+    parser.add_argument("--logs", type=int, default=100000, help="Number of synthetic logs (default: 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per parser, best time is reported (default: 3)")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.logs)
+    print(f"Synthetic corpus: {args.logs} logs")
+
+    results = {}
+    for name, parse in [("legacy", legacy_parse_climbing_lines), ("single-pass", parse_climbing_lines)]:
+        best = min(time_parser(parse, corpus) for _ in range(args.repeat))
+        results[name] = best
+        print(f"{name:>12}: {best:.3f}s  ({args.logs / best:,.0f} logs/s)")
+
+    print(f"Speedup: {results['legacy'] / results['single-pass']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Startup time of the climbing CLI.
+
+Runs each command in a fresh interpreter, the way a shell hook would, and
+reports the best and median wall time. A synthetic history is written to a
+temporary directory so the numbers do not depend on the local results file.
+
+    python benchmarks/startup_benchmark.py --sessions 10000
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from session_io import write_sessions
+
+CLIMBING = os.path.join(ROOT, 'climbing.py')
+HEAVY_MODULES = ('numpy', 'pandas', 'matplotlib', 'plotly', 'dash')
+
+
+def synthetic_sessions(count, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1, 18, 0)
+    for i in range(count):
+        grades = [f"V{rng.randint(1, 8)}" for _ in range(rng.randint(5, 40))]
+        yield {
+            "type": "Boulder" if rng.random() < 0.8 else "Rope",
+            "date": (start + timedelta(hours=6 * i)).isoformat(),
+            "time": rng.randint(30, 150),
+            "cal": rng.randint(200, 1500),
+            "attempted": grades[:rng.randint(0, 5)],
+            "climbed": grades,
+        }
+
+
+def time_command(command, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, cwd=ROOT)
+        timings.append(time.perf_counter() - started)
+    return min(timings), statistics.median(timings)
+
+
+def heavy_modules_loaded(argv):
+    # Run the command in-process and list the heavy libraries it pulled in
+    code = (
+        "import sys, contextlib, io, climbing\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        f"    climbing.main({argv!r})\n"
+        f"print(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True, cwd=ROOT)
+    return result.stdout.strip() or 'none'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure climbing CLI startup time")
+    parser.add_argument("--sessions", type=int, default=10000, help="Sessions in the synthetic history (default: 10000)")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per command (default: 10)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = os.path.join(tmp, 'climbing_results.json')
+        write_sessions(history, synthetic_sessions(args.sessions))
+        print(f"Synthetic history: {args.sessions} sessions, {os.path.getsize(history) / 1e6:.1f} MB")
+
+        stats = ['stats', '--last', '5', '-i', history]
+        commands = [
+            ("python -c pass", [sys.executable, '-c', 'pass']),
+            ("climbing --help", [sys.executable, CLIMBING, '--help']),
+            ("climbing stats --last 5", [sys.executable, CLIMBING] + stats),
+            ("climbing stats --last 5 --type Rope", [sys.executable, CLIMBING] + stats + ['--type', 'Rope']),
+            # What every command paid when the analytics libraries were imported at module top
+            ("import " + ", ".join(HEAVY_MODULES[:4]), [sys.executable, '-c', 'import numpy, pandas, matplotlib.pyplot, plotly.graph_objects']),
+        ]
+        for name, command in commands:
+            best, median = time_command(command, args.repeat)
+            print(f"{name:>40}: best {best * 1000:6.1f} ms, median {median * 1000:6.1f} ms")
+
+        print(f"Heavy modules loaded by stats: {heavy_modules_loaded(stats)}")
+
+
+if __name__ == "__main__":
+    main()
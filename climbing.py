@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import os
+import sys
+import argparse
+
+# One entry point for the climbing tools. Only the standard library is
+# imported up front; each subcommand imports its own modules when it runs,
+# so quick commands such as `stats --last 5` never load NumPy, pandas,
+# matplotlib or Dash.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# subcommand -> (module whose main() it runs, help)
+DELEGATED = {
+    'ingest': ('generate_json_file', "Parse a folder of climbing logs into a results file"),
+    'interpolate': ('interpolate_climbing_data', "Fill in missing calories and times"),
+    'render': ('render_charts', "Render the charts to image files"),
+}
+
+def run_delegated(args, extra):
+    import importlib
+    module, _ = DELEGATED[args.command]
+    importlib.import_module(module).main(extra, prog=f"{args.prog} {args.command}")
+
+def format_duration(minutes):
+    return f"{minutes // 60}h {minutes % 60:02d}m"
+
+def last_sessions(path, count, climb_type=None):
+    from session_io import tail_sessions
+    # Read a few more sessions from the end until enough of the requested type turn up
+    want = count
+    while True:
+        sessions = tail_sessions(path, want, expand=False)
+        matched = [session for session in sessions if climb_type is None or session['type'] == climb_type]
+        if len(matched) >= count or len(sessions) < want:
+            return matched[-count:]
+        want *= 4
+
+def run_stats(args, extra):
+    from session_io import send_count, attempt_count
+    sessions = last_sessions(args.input, args.last, args.type)
+    if not sessions:
+        print("No sessions")
+        return
+
+    print(f"{'Date':<16}  {'Type':<8}  {'Time':>6}  {'Cal':>5}  {'Sends':>5}  {'Attempts':>8}")
+    sends = 0
+    for session in sessions:
+        date = session['date'][:16].replace('T', ' ')
+        session_sends = send_count(session)
+        sends += session_sends
+        print(f"{date:<16}  {session['type']:<8}  {format_duration(session['time']):>6}  {session['cal']:>5}  "
+              f"{session_sends:>5}  {attempt_count(session):>8}")
+    total_time = sum(session['time'] for session in sessions)
+    total_cal = sum(session['cal'] for session in sessions)
+    print(f"{len(sessions)} sessions: {format_duration(total_time)}, {total_cal:,} cal, {sends} sends")
+
+def run_serve(args, extra):
+    sys.path.insert(0, os.path.join(SCRIPT_DIR, 'testing_dash'))
+    from app import create_app
+    create_app(args.data, shared=args.shared).run_server(host=args.host, port=args.port, debug=args.debug)
+
+def build_parser(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Climbing log tools")
+    subparsers = parser.add_subparsers(dest='command', metavar='command', required=True)
+
+    for command, (_, help) in DELEGATED.items():
+        # Options are parsed by the module's own CLI; `climbing ingest -h` lists them
+        delegated = subparsers.add_parser(command, help=help, add_help=False)
+        delegated.set_defaults(run=run_delegated, passthrough=True)
+
+    stats = subparsers.add_parser('stats', help="Summarize the most recent sessions")
+    stats.add_argument("-i", "--input", default="climbing_results.json", help="Session file (default: climbing_results.json)")
+    stats.add_argument("--last", type=int, default=5, help="Number of sessions (default: 5)")
+    stats.add_argument("--type", help="Only sessions of this type, e.g. Boulder")
+    stats.set_defaults(run=run_stats)
+
+    serve = subparsers.add_parser('serve', help="Run the dashboard")
+    serve.add_argument("--data", default="climbing_results.json", help="Session file (default: climbing_results.json)")
+    serve.add_argument("--host", default="127.0.0.1", help="Host to listen on (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8050, help="Port to listen on (default: 8050)")
+    serve.add_argument("--shared", action="store_true", help="Serve from the memory-mapped session store")
+    serve.add_argument("--debug", action="store_true", help="Run the Dash debug server")
+    serve.set_defaults(run=run_serve)
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if extra and not getattr(args, 'passthrough', False):
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.prog = parser.prog
+    args.run(args, extra)
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,7 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-
-def v_grade_to_numeric(v_grade):
-   if v_grade.startswith('V'):
-       try:
-           return int(v_grade[1:])
-       except ValueError:
-           return 0
-   return 0
+from grade_codec import v_grade_to_numeric
 
 def calculate_session_stats(boulder_data, session_ids):
    selected_sessions = boulder_data[boulder_data['session_id'].isin(session_ids)]
@@ -1,46 +1,108 @@
 import json
 from datetime import datetime
-import re
 import os
 import argparse
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from session_io import FORMATS, compact_session, file_hash, iter_sessions, session_key, write_sessions
+import session_db
 
-def parse_climbing_log(file_path):
-    with open(file_path, 'r') as file:
-        lines = [line.strip() for line in file if line.strip()]
-    
-    date_str = lines[0]
-    date = datetime.strptime(date_str, "%B %d, %Y at %I:%M %p")
-    
-    climb_type = lines[1]
-    
+DATE_FORMAT = "%B %d, %Y at %I:%M %p"
+MONTHS = {datetime(2000, m, 1).strftime('%B'): m for m in range(1, 13)}
+GREEN = '🟢'
+YELLOW = '🟡'
+
+# Parser states, in the order they appear in a log
+HEADER_DATE, HEADER_TYPE, GRADES, FOOTER = range(4)
+
+def parse_log_date(date_str):
+    # Fast path for "October 11, 2024 at 1:08 AM"; anything it does not match
+    # exactly goes to strptime, so both accept the same headers
+    try:
+        month, day, year, at, clock, meridiem = date_str.split()
+        hour, minute = clock.split(':')
+        digits = day[:-1] + year + hour + minute
+        if (at == 'at' and meridiem in ('AM', 'PM') and day.endswith(',') and digits.isascii() and digits.isdigit()
+                and len(day) <= 3 and len(year) == 4 and len(hour) <= 2 and len(minute) == 2 and 1 <= int(hour) <= 12):
+            hour = int(hour) % 12 + (12 if meridiem == 'PM' else 0)
+            return datetime(int(year), MONTHS[month], int(day[:-1]), hour, int(minute))
+    except (ValueError, KeyError):
+        pass
+    return datetime.strptime(date_str, DATE_FORMAT)
+
+def parse_duration(text):
+    # Handles "1h 58m", "50m 46s", "44s" and "2056h 47m"
+    seconds = 0
+    for token in text.split():
+        unit = token[-1:]
+        value = token[:-1]
+        if not value.isdigit():
+            continue
+        if unit == 'h':
+            seconds += int(value) * 3600
+        elif unit == 'm':
+            seconds += int(value) * 60
+        elif unit == 's':
+            seconds += int(value)
+    return (seconds + 30) // 60
+
+def parse_climbing_lines(lines):
+    """Parse one climbing log from an iterable of lines in a single walk.
+
+    The log is read as a small state machine: the date and climb type
+    header, then one "grade: marks" line per grade until "Max:", the
+    "Pinnacle Climb Log" banner or the first footer line, then a footer of
+    label/value pairs ("Time", "Cal" or "Elev Gain").
+    """
+    state = HEADER_DATE
+    date = None
+    climb_type = None
     attempted = []
     climbed = []
-    
-    for line in lines[2:]:
-        if line.startswith("Max:") or line.startswith("Pinnacle Climb Log"):
-            break
-        if ':' in line:
-            grade, emojis = line.split(':')
-            grade = grade.strip()
-            green_count = emojis.count('🟢')
-            yellow_count = emojis.count('🟡')
-            
-            climbed.extend([grade] * green_count)
-            attempted.extend([grade] * yellow_count)
-    
-    content = ' '.join(lines)
-    
-    time_match = re.search(r'(\d+)h (\d+)m', content)
     total_minutes = 0
-    if time_match:
-        hours, minutes = map(int, time_match.groups())
-        total_minutes = hours * 60 + minutes
-    
-    cal_match = re.search(r'([\d,]+) Cal', content)
     calories = 0
-    if cal_match:
-        calories = int(cal_match.group(1).replace(',', ''))
-    
+    expect_time = False
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        if state == GRADES and (line == "Time" or line.endswith(" Cal")):
+            # A log without the "Max:" line or banner goes straight to the footer
+            state = FOOTER
+
+        if state == GRADES:
+            if line.startswith("Max:") or line.startswith("Pinnacle Climb Log"):
+                state = FOOTER
+                continue
+            grade, sep, marks = line.partition(':')
+            if not sep:
+                continue
+            grade = grade.strip()
+            marks = marks.strip()
+            climbed.extend([grade] * marks.count(GREEN))
+            attempted.extend([grade] * marks.count(YELLOW))
+        elif state == FOOTER:
+            if expect_time:
+                total_minutes = parse_duration(line)
+                expect_time = False
+            elif line == "Time":
+                expect_time = True
+            elif line.endswith(" Cal"):
+                value = line[:-4].replace(',', '')
+                if value.isdigit():
+                    calories = int(value)
+        elif state == HEADER_DATE:
+            date = parse_log_date(line)
+            state = HEADER_TYPE
+        else:
+            climb_type = line
+            state = GRADES
+
+    if climb_type is None:
+        raise ValueError("log is missing its date or climb type header")
+
     return {
         "type": climb_type,
         "date": date.isoformat(),
@@ -50,31 +112,226 @@ def parse_climbing_log(file_path):
         "climbed": climbed
     }
 
-def process_folder(folder_path, output_file):
-    results = []
-    for filename in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, filename)
-        try:
-            result = parse_climbing_log(file_path)
-            results.append(result)
-        except Exception as e:
-            print(f"Error processing {filename}: {e}")
-    
-    results.sort(key=lambda x: x['date'])  # Sort results by date
+def parse_climbing_log(file_path):
+    with open(file_path, 'r') as file:
+        return parse_climbing_lines(file)
+
+def file_fingerprint(file_path):
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+def manifest_path_for(output_file):
+    return output_file + '.manifest.json'
+
+def load_manifest(manifest_file):
+    if not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file, 'r') as f:
+        return json.load(f)
+
+def save_manifest(manifest_file, manifest):
+    with open(manifest_file, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+def session_date(key):
+    return key.split('|', 1)[0]
+
+def parse_log_file(file_path):
+    # Errors are returned instead of raised so pool workers report them like the serial path
+    try:
+        return parse_climbing_log(file_path), None
+    except Exception as e:
+        return None, str(e)
+
+def parse_files(file_paths, workers=1):
+    """Yield (file_path, result, error) for each path, in the order given.
+
+    With more than one worker the files are spread across a process pool in
+    chunks; executor.map keeps the output order identical to the serial path.
+    """
+    if workers <= 1 or len(file_paths) < 2:
+        for file_path in file_paths:
+            yield (file_path,) + parse_log_file(file_path)
+        return
+
+    chunksize = max(1, len(file_paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for file_path, outcome in zip(file_paths, executor.map(parse_log_file, file_paths, chunksize=chunksize)):
+            yield (file_path,) + outcome
+
+def list_log_files(folder_path):
+    # Sorted so errors are reported in the same order on every run
+    return [
+        os.path.join(folder_path, filename)
+        for filename in sorted(os.listdir(folder_path))
+        if os.path.isfile(os.path.join(folder_path, filename))
+    ]
+
+def log_date_key(file_path):
+    # Only the header line is read; unreadable headers sort first and fail again when parsed
+    try:
+        with open(file_path, 'r') as file:
+            for line in file:
+                if line.strip():
+                    return parse_log_date(line.strip()).isoformat()
+    except (OSError, ValueError, UnicodeDecodeError):
+        pass
+    return ''
+
+def iter_parsed_logs(file_paths, workers=1):
+    # Yields parsed sessions in date order, printing errors as they come up
+    for file_path, result, error in parse_files(file_paths, workers):
+        if error is not None:
+            print(f"Error processing {os.path.basename(file_path)}: {error}")
+        else:
+            yield result
+
+def process_folder(folder_path, output_file, workers=1, fmt=None, compact=False, sqlite_path=None):
+    # Order files by their header date so sessions can be streamed straight to the output
+    file_paths = sorted(list_log_files(folder_path), key=log_date_key)
     
-    with open(output_file, 'w') as f:
-        json.dump(results, f, indent=2)
+    results = iter_parsed_logs(file_paths, workers)
+    if compact:
+        results = map(compact_session, results)
+    if sqlite_path:
+        # The database mirrors the output, so it is rebuilt alongside it
+        db = session_db.connect(sqlite_path)
+        with db:
+            db.execute('DELETE FROM sessions')
+            count = write_sessions(output_file, session_db.iter_saved(db, results), fmt)
+        db.close()
+    else:
+        count = write_sessions(output_file, results, fmt)
     
-    print(f"Processed {len(results)} files. Results saved to {output_file}")
+    print(f"Processed {count} files. Results saved to {output_file}")
+
+def process_folder_incremental(folder_path, output_file, manifest_file=None, workers=1, fmt=None, compact=False, sqlite_path=None):
+    """Parse only logs that are new or changed since the last run.
+
+    The manifest maps each log's path to its size, mtime, content hash and
+    the key of the session it produced, so unchanged files are skipped
+    without being read and deleted files drop their session from the output.
+    Several logs can produce sessions with the same date, e.g. a copied log;
+    every date touched by a change is rebuilt from all the logs that map to
+    it, so the output always matches a full process_folder run.
+    """
+    manifest_file = manifest_file or manifest_path_for(output_file)
+    old_manifest = load_manifest(manifest_file)
+    if old_manifest and not os.path.exists(output_file):
+        # Output was removed, so every log needs to be parsed again
+        old_manifest = {}
+    new_manifest = {}
+    stale_keys = set()
+    new_logs = []
+    to_parse = []
+    skipped = 0
+
+    for file_path in list_log_files(folder_path):
+        size, mtime = file_fingerprint(file_path)
+        entry = old_manifest.get(file_path)
+
+        if entry and entry['size'] == size and entry['mtime'] == mtime:
+            new_manifest[file_path] = entry
+            skipped += 1
+            continue
+
+        digest = file_hash(file_path)
+        if entry and entry['hash'] == digest:
+            # Touched but not modified
+            new_manifest[file_path] = dict(entry, size=size, mtime=mtime)
+            skipped += 1
+            continue
+
+        if entry and entry.get('key'):
+            stale_keys.add(entry['key'])
+        new_manifest[file_path] = {'size': size, 'mtime': mtime, 'hash': digest, 'key': None}
+        to_parse.append(file_path)
+
+    for file_path, result, error in parse_files(to_parse, workers):
+        if error is not None:
+            print(f"Error processing {os.path.basename(file_path)}: {error}")
+            continue
+        new_logs.append((file_path, result))
+        new_manifest[file_path]['key'] = session_key(result)
+
+    for file_path in old_manifest.keys() - new_manifest.keys():
+        if old_manifest[file_path].get('key'):
+            stale_keys.add(old_manifest[file_path]['key'])
+
+    # Unchanged logs sharing a date with a changed one are parsed again, so
+    # their sessions are rewritten alongside it in file order
+    parsed = len(new_logs)
+    touched_dates = {session_date(key) for key in stale_keys} | {result['date'] for _, result in new_logs}
+    changed = set(to_parse)
+    to_reparse = sorted(
+        file_path for file_path, entry in new_manifest.items()
+        if file_path not in changed and entry.get('key') and session_date(entry['key']) in touched_dates
+    )
+    for file_path, result, error in parse_files(to_reparse, workers):
+        if error is not None:
+            print(f"Error processing {os.path.basename(file_path)}: {error}")
+            continue
+        new_logs.append((file_path, result))
+
+    # Same-date sessions keep the file order process_folder uses
+    new_logs.sort(key=lambda log: (log[1]['date'], log[0]))
+    new_results = [result for _, result in new_logs]
+
+    db = session_db.connect(sqlite_path) if sqlite_path else None
+    # A new database has to be filled from the whole output, not just the changes
+    db_empty = db is not None and db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0] == 0
+
+    if not new_results and not stale_keys and os.path.exists(output_file) and not db_empty:
+        if db is not None:
+            db.close()
+        save_manifest(manifest_file, new_manifest)
+        print(f"No new or changed logs ({skipped} unchanged). {output_file} is up to date")
+        return
+
+    existing = iter(())
+    if old_manifest and os.path.exists(output_file):
+        existing = iter_sessions(output_file, expand=not compact)
+    existing = (r for r in existing if r['date'] not in touched_dates)
+
+    # Both streams are sorted by date, so a merge keeps the output sorted
+    results = heapq.merge(existing, new_results, key=lambda x: x['date'])
+    if compact:
+        results = map(compact_session, results)
+    if db is not None:
+        with db:
+            if db_empty:
+                results = session_db.iter_saved(db, results)
+            else:
+                replaced = stale_keys | {session_key(r) for r in new_results}
+                session_db.delete_sessions(db, [tuple(key.split('|', 1)) for key in replaced])
+                for result in new_results:
+                    session_db.insert_session(db, result)
+            count = write_sessions(output_file, results, fmt)
+        db.close()
+    else:
+        count = write_sessions(output_file, results, fmt)
+    save_manifest(manifest_file, new_manifest)
+
+    print(f"Parsed {parsed} new or changed files, skipped {skipped} unchanged. "
+          f"{count} sessions saved to {output_file}")
 
-def main():
-    parser = argparse.ArgumentParser(description="Process climbing log files from a folder.")
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Process climbing log files from a folder.")
     parser.add_argument("folder", help="Path to the folder containing climbing log files")
     parser.add_argument("-o", "--output", default="climbing_results.json", help="Output file name (default: climbing_results.json)")
+    parser.add_argument("--incremental", action="store_true", help="Only parse new or changed logs, tracked in a manifest next to the output")
+    parser.add_argument("--manifest", help="Manifest file for --incremental (default: <output>.manifest.json)")
+    parser.add_argument("--format", choices=FORMATS, help="Output format: pretty JSON array or NDJSON (default: from the output file extension)")
+    parser.add_argument("--compact", action="store_true", help="Store grades as {grade: [sends, attempts]} counts instead of attempted/climbed lists")
+    parser.add_argument("--sqlite", help="Also write the sessions to this SQLite database")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes used to parse logs (default: 1)")
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
-    process_folder(args.folder, args.output)
+    if args.incremental:
+        process_folder_incremental(args.folder, args.output, args.manifest, args.workers, args.format, args.compact, args.sqlite)
+    else:
+        process_folder(args.folder, args.output, args.workers, args.format, args.compact, args.sqlite)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,60 @@
+from itertools import repeat
+
+import numpy as np
+
+# Every grade the logs can contain gets a small integer code, so grades can be
+# stored as uint8 and compared without parsing strings. Codes sort by difficulty
+# within a scale: V-scale boulder grades first, then YDS rope grades.
+UNKNOWN_GRADE = 0
+
+V_GRADES = ['VB'] + [f'V{n}' for n in range(18)]
+YDS_GRADES = [f'5.{n}' for n in range(10)] + [
+    f'5.{n}{letter}' for n in range(10, 16) for letter in ('', 'a', 'b', 'c', 'd')
+]
+
+GRADES = [None] + V_GRADES + YDS_GRADES
+GRADE_CODES = {grade: code for code, grade in enumerate(GRADES) if grade is not None}
+
+def _parse_v_grade(grade):
+    if grade.startswith('V'):
+        try:
+            return int(grade[1:])
+        except ValueError:
+            return 0
+    return 0
+
+class _NumericTable(dict):
+    # Grades outside the precomputed table are parsed once and interned
+    def __missing__(self, grade):
+        value = self[grade] = _parse_v_grade(grade)
+        return value
+
+# The analytics treat a grade as its V number; VB, YDS and anything unparseable count as 0
+V_NUMERIC = _NumericTable((grade, _parse_v_grade(grade)) for grade in GRADE_CODES)
+NUMERIC_BY_CODE = np.array([0] + [V_NUMERIC[grade] for grade in GRADES[1:]], dtype=np.int16)
+
+# A plain table lookup, so per-climb calls do not go through a Python function
+v_grade_to_numeric = V_NUMERIC.__getitem__
+
+def grade_code(grade):
+    return GRADE_CODES.get(grade, UNKNOWN_GRADE)
+
+def grade_name(code):
+    return GRADES[code] if 0 < code < len(GRADES) else None
+
+def _map_grades(grades, lookup, dtype, *defaults):
+    # One dict lookup per grade, run by map() and np.fromiter without a Python-level loop
+    shape = None
+    if isinstance(grades, np.ndarray):
+        shape = grades.shape
+        grades = grades.ravel().tolist()
+    values = np.fromiter(map(lookup, grades, *defaults), dtype=dtype, count=len(grades))
+    return values.reshape(shape) if shape is not None else values
+
+def encode(grades):
+    """Encode an array of grade strings as uint8 grade codes; unknown grades become 0."""
+    return _map_grades(grades, GRADE_CODES.get, np.uint8, repeat(UNKNOWN_GRADE))
+
+def to_numeric(grades):
+    """Vectorized v_grade_to_numeric over an array of grade strings."""
+    return _map_grades(grades, v_grade_to_numeric, np.int16)
@@ -0,0 +1,37 @@
+from itertools import chain
+
+import numpy as np
+
+from grade_codec import GRADES, encode, to_numeric
+
+def _flatten(grade_lists):
+    # Every grade in one flat list, the session each one came from and each session's length
+    lengths = np.fromiter((len(grades) for grades in grade_lists), dtype=np.int64, count=len(grade_lists))
+    rows = np.repeat(np.arange(len(grade_lists)), lengths)
+    return list(chain.from_iterable(grade_lists)), rows, lengths
+
+def grade_count_matrix(grade_lists, grades):
+    """Count each of grades in every list, as a [session, grade] int64 matrix.
+
+    One np.bincount over (session, column) cells instead of a list.count()
+    per grade and session; grades not in the requested columns are ignored.
+    """
+    flat, rows, _ = _flatten(grade_lists)
+    # Grade code -> column in the matrix, -1 for grades that are not shown
+    columns = np.full(len(GRADES), -1, dtype=np.int64)
+    for column, grade in enumerate(grades):
+        columns[GRADES.index(grade)] = column
+    cells = columns[encode(flat)] if flat else np.zeros(0, dtype=np.int64)
+    shown = cells >= 0
+    width = len(grades)
+    counts = np.bincount(rows[shown] * width + cells[shown], minlength=len(grade_lists) * width)
+    return counts.reshape(len(grade_lists), width)
+
+def grade_sums_and_averages(grade_lists):
+    """Per-list sum and mean of the numeric V grades; both are 0 for an empty list."""
+    flat, rows, _ = _flatten(grade_lists)
+    numeric = to_numeric(flat) if flat else np.zeros(0, dtype=np.int16)
+    sums = np.bincount(rows, weights=numeric, minlength=len(grade_lists)).astype(np.int64)
+    counts = np.bincount(rows, minlength=len(grade_lists))
+    averages = np.divide(sums, counts, out=np.zeros(len(grade_lists)), where=counts > 0)
+    return sums, averages
@@ -1,73 +1,330 @@
 import json
+import os
 import argparse
-from datetime import datetime
+import bisect
+from collections import deque
+from datetime import datetime, timedelta
 
-def calculate_avg_value_per_climb(sessions, key):
-    # For time, filter out invalid values (< 10 or > 300)
+import numpy as np
+
+from session_io import FORMATS, append_sessions, iter_sessions, send_count, session_key, write_sessions
+
+# Times outside this range (minutes) are treated as bad recordings
+MIN_TIME = 10
+MAX_TIME = 300
+
+def is_valid_value(session, key):
+    # For time, filter out invalid values (< 10 or > 300); for calories, missing values are 0
     if key == 'time':
-        valid_sessions = [s for s in sessions if 10 <= s[key] <= 300]
-    else:  # for calories
-        valid_sessions = [s for s in sessions if s[key] > 0]
-    
-    if not valid_sessions:
-        return None
-    
+        return MIN_TIME <= session[key] <= MAX_TIME
+    return session[key] > 0
+
+def calculate_avg_value_per_climb(sessions, key):
+    # Single pass so sessions can be a stream
     total_value = 0
     total_climbs = 0
+    found = False
+    
+    for session in sessions:
+        if is_valid_value(session, key):
+            found = True
+            total_value += session[key]
+            total_climbs += send_count(session)
     
-    for session in valid_sessions:
-        total_value += session[key]
-        total_climbs += len(session['climbed'])
+    if not found:
+        return None
     
     return total_value / total_climbs
 
-def interpolate_values(sessions):
-    # Calculate averages
-    avg_cal_per_climb = calculate_avg_value_per_climb(sessions, 'cal')
-    avg_time_per_climb = calculate_avg_value_per_climb(sessions, 'time')
-    
-    new_sessions = []
-    
+def session_columns(sessions):
+    """Read time, cal and send counts of a session stream into int64 arrays."""
+    time = []
+    cal = []
+    sends = []
     for session in sessions:
+        time.append(session['time'])
+        cal.append(session['cal'])
+        sends.append(send_count(session))
+    return (np.array(time, dtype=np.int64), np.array(cal, dtype=np.int64), np.array(sends, dtype=np.int64))
+
+def _avg_per_climb(values, sends, valid):
+    climbs = sends[valid].sum()
+    if not valid.any() or climbs == 0:
+        return None
+    return float(values[valid].sum() / climbs)
+
+def interpolate_columns(time, cal, sends):
+    """Fill missing calories and invalid times as one set of array operations.
+
+    Returns the filled time and cal arrays and a summary with the per-climb
+    averages and how many sessions were filled, all from the same masks.
+    """
+    time_invalid = (time < MIN_TIME) | (time > MAX_TIME)
+    cal_missing = cal == 0
+
+    avg_cal = _avg_per_climb(cal, sends, cal > 0)
+    avg_time = _avg_per_climb(time, sends, ~time_invalid)
+
+    fill_cal = cal_missing if avg_cal is not None else np.zeros_like(cal_missing)
+    fill_time = time_invalid if avg_time is not None else np.zeros_like(time_invalid)
+
+    # np.rint rounds half to even, like round() did per session
+    new_cal = np.where(fill_cal, np.rint((avg_cal or 0) * sends), cal).astype(np.int64)
+    new_time = np.where(fill_time, np.rint((avg_time or 0) * sends), time).astype(np.int64)
+
+    summary = {
+        'avg_cal': avg_cal,
+        'avg_time': avg_time,
+        'calories': int(fill_cal.sum()),
+        'time': int(fill_time.sum()),
+    }
+    return new_time, new_cal, summary
+
+def iter_filled(sessions, time, cal):
+    # Copies each session with its filled values; sessions must be in the same order as the arrays
+    for session, session_time, session_cal in zip(sessions, time.tolist(), cal.tolist()):
         new_session = session.copy()
+        new_session['time'] = session_time
+        new_session['cal'] = session_cal
+        yield new_session
+
+def interpolate_sessions(sessions):
+    """Return the filled sessions and the change summary."""
+    time, cal, summary = interpolate_columns(*session_columns(sessions))
+    return list(iter_filled(sessions, time, cal)), summary
+
+def interpolate_values(sessions):
+    return interpolate_sessions(sessions)[0]
+
+def _empty_totals():
+    # [sum of valid values, climbs in the sessions that had them] per key
+    return {'cal': [0, 0], 'time': [0, 0]}
+
+class RollingInterpolator:
+    """Running per-climb averages per climb type, overall and over a trailing window.
+
+    Sessions are expected in date order. Each add updates the overall totals
+    and the window totals in O(1) (amortized over evictions), and missing
+    values are filled from the window as it stands before the session, falling
+    back to the overall average when the window holds no valid data. A late
+    session older than the last one added is slotted into the window by date.
+    The state keeps the sessions inside the window and the key of every
+    session added, so it can be saved and resumed without refilling history.
+    """
+
+    def __init__(self, window_days=90):
+        self.window_days = window_days
+        self.last_date = None
+        self.types = {}
+        self.seen = set()
+
+    def _state(self, climb_type):
+        if climb_type not in self.types:
+            self.types[climb_type] = {'total': _empty_totals(), 'window': _empty_totals(), 'recent': deque()}
+        return self.types[climb_type]
+
+    def _evict(self, state, date):
+        # Drop sessions that fell out of the trailing window
+        cutoff = (datetime.fromisoformat(date) - timedelta(days=self.window_days)).isoformat()
+        recent = state['recent']
+        window = state['window']
+        while recent and recent[0][0] < cutoff:
+            _, cal, cal_climbs, time, time_climbs = recent.popleft()
+            window['cal'][0] -= cal
+            window['cal'][1] -= cal_climbs
+            window['time'][0] -= time
+            window['time'][1] -= time_climbs
+
+    def average(self, climb_type, key):
+        state = self.types.get(climb_type)
+        if state is None:
+            return None
+        for totals in (state['window'], state['total']):
+            value, climbs = totals[key]
+            if climbs > 0:
+                return value / climbs
+        return None
+
+    def fill(self, session):
+        """Return a copy of session with missing cal and out-of-range time filled."""
+        state = self._state(session['type'])
+        self._evict(state, session['date'])
+        new_session = session.copy()
+        num_climbs = send_count(session)
+        filled = []
         
-        # Interpolate calories if needed
-        if session['cal'] == 0 and avg_cal_per_climb is not None:
-            num_climbs = len(session['climbed'])
-            new_session['cal'] = round(avg_cal_per_climb * num_climbs)
+        avg_cal = self.average(session['type'], 'cal')
+        if session['cal'] == 0 and avg_cal is not None:
+            new_session['cal'] = round(avg_cal * num_climbs)
+            filled.append('cal')
         
-        # Interpolate time if needed
-        if (session['time'] < 10 or session['time'] > 300) and avg_time_per_climb is not None:
-            num_climbs = len(session['climbed'])
-            new_session['time'] = round(avg_time_per_climb * num_climbs)
+        avg_time = self.average(session['type'], 'time')
+        if (session['time'] < MIN_TIME or session['time'] > MAX_TIME) and avg_time is not None:
+            new_session['time'] = round(avg_time * num_climbs)
+            filled.append('time')
         
-        new_sessions.append(new_session)
-    
-    return new_sessions
+        return new_session, filled
+
+    def add(self, session):
+        state = self._state(session['type'])
+        self._evict(state, session['date'])
+        num_climbs = send_count(session)
+        entry = [session['date'], 0, 0, 0, 0]
+        if is_valid_value(session, 'cal'):
+            entry[1:3] = [session['cal'], num_climbs]
+        if is_valid_value(session, 'time'):
+            entry[3:5] = [session['time'], num_climbs]
+        for totals in (state['total'], state['window']):
+            totals['cal'][0] += entry[1]
+            totals['cal'][1] += entry[2]
+            totals['time'][0] += entry[3]
+            totals['time'][1] += entry[4]
+        recent = state['recent']
+        if recent and entry[0] < recent[-1][0]:
+            # Keep the window sorted so eviction stays a popleft
+            recent.insert(bisect.bisect_right([e[0] for e in recent], entry[0]), entry)
+        else:
+            recent.append(entry)
+        self.seen.add(session_key(session))
+        self.last_date = session['date'] if self.last_date is None else max(self.last_date, session['date'])
+        self._evict(state, self.last_date)
+
+    def merge(self, other):
+        """Fold another interpolator's aggregates into this one.
+
+        Overall totals add up; window entries are merged by date and the
+        window is re-trimmed to the later of the two last dates.
+        """
+        for climb_type, other_state in other.types.items():
+            state = self._state(climb_type)
+            for key in ('cal', 'time'):
+                for part in (0, 1):
+                    state['total'][key][part] += other_state['total'][key][part]
+            recent = sorted(list(state['recent']) + [list(entry) for entry in other_state['recent']], key=lambda entry: entry[0])
+            state['recent'] = deque(recent)
+            state['window'] = _empty_totals()
+            for _, cal, cal_climbs, time, time_climbs in recent:
+                state['window']['cal'][0] += cal
+                state['window']['cal'][1] += cal_climbs
+                state['window']['time'][0] += time
+                state['window']['time'][1] += time_climbs
+        self.seen |= other.seen
+        dates = [date for date in (self.last_date, other.last_date) if date is not None]
+        self.last_date = max(dates) if dates else None
+        if self.last_date is not None:
+            for state in self.types.values():
+                self._evict(state, self.last_date)
+
+    def to_dict(self):
+        return {
+            'window_days': self.window_days,
+            'last_date': self.last_date,
+            'seen': sorted(self.seen),
+            'types': {
+                climb_type: {'total': state['total'], 'window': state['window'], 'recent': list(state['recent'])}
+                for climb_type, state in self.types.items()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        interpolator = cls(data['window_days'])
+        interpolator.last_date = data['last_date']
+        # States saved before keys were tracked get them from the output file
+        interpolator.seen = set(data['seen']) if 'seen' in data else None
+        for climb_type, state in data['types'].items():
+            interpolator.types[climb_type] = {
+                'total': state['total'],
+                'window': state['window'],
+                'recent': deque(state['recent'])
+            }
+        return interpolator
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+def rolling_interpolate(input_file, output_file, window_days=90, state_file=None, fmt=None):
+    """Fill sessions from rolling per-type averages, resuming from state_file.
+
+    Sessions whose keys an earlier run recorded are skipped; the input is
+    still read to find the rest, but only newly seen sessions are filled,
+    folded into the aggregates and appended to output_file. A back-filled
+    session older than the last one handled is filled from the averages as
+    they stand and appended out of date order, with a warning. Without a saved
+    state the output is rebuilt from the start of the input.
+    """
+    state_file = state_file or output_file + '.rolling.json'
+    if os.path.exists(state_file) and os.path.exists(output_file):
+        interpolator = RollingInterpolator.load(state_file)
+        if interpolator.window_days != window_days:
+            raise ValueError(f"{state_file} was built with a {interpolator.window_days}-day window; delete it to rebuild with {window_days} days")
+        if interpolator.seen is None:
+            interpolator.seen = {session_key(session) for session in iter_sessions(output_file, expand=False)}
+    else:
+        interpolator = RollingInterpolator(window_days)
+        write_sessions(output_file, iter(()), fmt)
+
+    changes = {'sessions': 0, 'calories': 0, 'time': 0}
 
-def main():
-    parser = argparse.ArgumentParser(description='Interpolate missing calories and invalid times in climbing data')
+    def new_sessions():
+        for session in iter_sessions(input_file, expand=False):
+            if session_key(session) in interpolator.seen:
+                continue
+            if interpolator.last_date is not None and session['date'] < interpolator.last_date:
+                print(f"Warning: {session['type']} session on {session['date']} is older than the last one interpolated; "
+                      f"filled from the current averages and appended out of order")
+            new_session, filled = interpolator.fill(session)
+            interpolator.add(session)
+            changes['sessions'] += 1
+            changes['calories'] += 'cal' in filled
+            changes['time'] += 'time' in filled
+            yield new_session
+
+    append_sessions(output_file, new_sessions(), fmt)
+    interpolator.save(state_file)
+    return changes
+
+def interpolate_file(input_file, output_file, fmt=None):
+    """Fill every session of input_file from whole-file averages and write output_file.
+
+    Returns the summary from interpolate_columns.
+    """
+    # The first pass reads the numeric columns, the second streams the filled sessions out
+    time, cal, changes = interpolate_columns(*session_columns(iter_sessions(input_file, expand=False)))
+    write_sessions(output_file, iter_filled(iter_sessions(input_file, expand=False), time, cal), fmt)
+    return changes
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Interpolate missing calories and invalid times in climbing data')
     parser.add_argument('input_file', help='Input JSON file path')
     parser.add_argument('output_file', help='Output JSON file path')
+    parser.add_argument('--format', choices=FORMATS, help='Output format: pretty JSON array or NDJSON (default: from the output file extension)')
+    parser.add_argument('--rolling', action='store_true', help='Fill from per-type averages over a trailing window, appending only sessions newer than the saved state')
+    parser.add_argument('--window-days', type=int, default=90, help='Trailing window for --rolling (default: 90)')
+    parser.add_argument('--state', help='Aggregate state file for --rolling (default: <output_file>.rolling.json)')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     try:
-        # Read input file
-        with open(args.input_file, 'r') as f:
-            sessions = json.load(f)
+        if args.rolling:
+            changes = rolling_interpolate(args.input_file, args.output_file, args.window_days, args.state, args.format)
+            print(f"\nAppended {changes['sessions']} new sessions to {args.output_file}")
+            print("\nChanges made:")
+            print(f"Interpolated calories for {changes['calories']} sessions")
+            print(f"Interpolated time for {changes['time']} sessions")
+            return
         
-        # Process the data
-        new_sessions = interpolate_values(sessions)
-        
-        # Write output file
-        with open(args.output_file, 'w') as f:
-            json.dump(new_sessions, f, indent=2)
+        changes = interpolate_file(args.input_file, args.output_file, args.format)
+        avg_cal = changes['avg_cal']
+        avg_time = changes['avg_time']
         
         # Print statistics
-        avg_cal = calculate_avg_value_per_climb(sessions, 'cal')
-        avg_time = calculate_avg_value_per_climb(sessions, 'time')
-        
         print("\nInterpolation Statistics:")
         if avg_cal:
             print(f"Average calories per climb: {avg_cal:.2f}")
@@ -82,10 +339,6 @@ def main():
         print(f"\nSuccessfully wrote interpolated data to {args.output_file}")
         
         # Print summary of changes
-        changes = {
-            'calories': sum(1 for s in sessions if s['cal'] == 0),
-            'time': sum(1 for s in sessions if s['time'] < 10 or s['time'] > 300)
-        }
         print("\nChanges made:")
         print(f"Interpolated calories for {changes['calories']} sessions")
         print(f"Interpolated time for {changes['time']} sessions")
@@ -0,0 +1,180 @@
+import os
+import sys
+import json
+import types
+import hashlib
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+
+# Headless: charts are written to files and no window is ever opened
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+import pandas as pd
+
+from session_metrics import load_boulder_data, load_or_compute_metrics
+
+# chart name -> (module, function, argument); the function returns a figure and
+# takes either the boulder sessions or their session_metrics frame, passed as
+# the named argument
+CHARTS = {
+    'grade_bars': ('climbing_graph_code', 'plot_grade_bars', 'boulder_data'),
+    'session_grid': ('grid_graph', 'plot_session_grid', 'metrics'),
+}
+FORMATS = ('png', 'svg')
+CACHE_FILE = '.render_cache.json'
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def chart_function(chart):
+    module, function, _ = CHARTS[chart]
+    return getattr(importlib.import_module(module), function)
+
+def project_modules(name):
+    """The named module and every module of this project it uses, directly or not.
+
+    Found from the modules, functions and classes in each module's namespace,
+    so `from grade_matrix import grade_count_matrix` counts as a dependency.
+    """
+    found = set()
+    pending = [name]
+    while pending:
+        name = pending.pop()
+        module = sys.modules.get(name)
+        path = getattr(module, '__file__', None)
+        if name in found or path is None or os.path.dirname(os.path.abspath(path)) != PROJECT_DIR:
+            continue
+        found.add(name)
+        for value in vars(module).values():
+            dependency = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, '__module__', None)
+            if isinstance(dependency, str):
+                pending.append(dependency)
+    return sorted(found)
+
+def source_hash(chart):
+    # Editing a chart's module, or any project module it computes with,
+    # invalidates everything it rendered
+    importlib.import_module(CHARTS[chart][0])
+    digest = hashlib.sha256()
+    for name in project_modules(CHARTS[chart][0]):
+        with open(sys.modules[name].__file__, 'rb') as f:
+            digest.update(f"{name}|".encode() + hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def cache_key(chart, data, formats, code_hash):
+    digest = hashlib.sha256()
+    digest.update(f"{chart}|{','.join(formats)}|{code_hash}|{matplotlib.__version__}|".encode())
+    digest.update(data.to_json(orient='records', date_format='iso').encode())
+    return digest.hexdigest()
+
+def variants(frames, per_month=False, per_session=False):
+    """Yield (variant, frames): every session, then optionally each month and each session alone.
+
+    frames maps an argument name to a per-session frame with a date column;
+    all of them hold the same sessions in the same order and are sliced alike.
+    """
+    yield 'all', frames
+    dates = pd.to_datetime(next(iter(frames.values()))['date'])
+    if per_month:
+        for period, rows in dates.groupby(dates.dt.to_period('M')).indices.items():
+            yield f'month-{period}', {name: frame.iloc[rows].reset_index(drop=True) for name, frame in frames.items()}
+    if per_session:
+        for index, date in dates.items():
+            yield (f"session-{date.strftime('%Y-%m-%d_%H%M')}",
+                   {name: frame.iloc[[index]].reset_index(drop=True) for name, frame in frames.items()})
+
+def render_job(chart, data, paths):
+    # Runs in a worker process: draw once, save in every requested format
+    fig = chart_function(chart)(**{CHARTS[chart][2]: data})
+    for path in paths:
+        fig.savefig(path)
+    plt.close(fig)
+    return paths
+
+def load_cache(out_dir):
+    path = os.path.join(out_dir, CACHE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_cache(out_dir, cache):
+    path = os.path.join(out_dir, CACHE_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def render_all(data_path, out_dir, charts=None, formats=FORMATS, per_month=False, per_session=False,
+               workers=None, force=False, metrics_path=None):
+    """Render every chart and variant into out_dir; returns (rendered, skipped) output counts.
+
+    An output is skipped when its cache key (chart code, data subset, formats
+    and matplotlib version) matches the one recorded when it was last written
+    and the files are still there. Metrics charts draw from the sidecar
+    metrics file (metrics_path, default <input>.metrics.json), which is only
+    recomputed when the session file changed since it was written.
+    """
+    charts = charts or list(CHARTS)
+    arguments = {CHARTS[chart][2] for chart in charts}
+    frames = {}
+    if 'boulder_data' in arguments:
+        frames['boulder_data'] = load_boulder_data(data_path)
+    if 'metrics' in arguments:
+        frames['metrics'] = load_or_compute_metrics(data_path, metrics_path)
+    code_hashes = {chart: source_hash(chart) for chart in charts}
+    cache = {} if force else load_cache(out_dir)
+
+    jobs = []
+    skipped = 0
+    for variant, variant_frames in variants(frames, per_month, per_session):
+        for chart in charts:
+            data = variant_frames[CHARTS[chart][2]]
+            if data.empty:
+                continue
+            directory = os.path.join(out_dir, chart)
+            paths = [os.path.join(directory, f'{variant}.{fmt}') for fmt in formats]
+            key = cache_key(chart, data, formats, code_hashes[chart])
+            name = f'{chart}/{variant}'
+            if cache.get(name) == key and all(os.path.exists(path) for path in paths):
+                skipped += len(paths)
+                continue
+            os.makedirs(directory, exist_ok=True)
+            jobs.append((name, key, chart, data, paths))
+
+    rendered = 0
+    os.makedirs(out_dir, exist_ok=True)
+    try:
+        if jobs:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [(name, key, executor.submit(render_job, chart, data, paths))
+                           for name, key, chart, data, paths in jobs]
+                for name, key, future in futures:
+                    rendered += len(future.result())
+                    cache[name] = key
+    finally:
+        # Keep what finished even if one chart failed
+        save_cache(out_dir, cache)
+    return rendered, skipped
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Render every climbing chart to image files without opening windows")
+    parser.add_argument("input_file", nargs="?", default="climbing_results.json", help="Session file (default: climbing_results.json)")
+    parser.add_argument("--out", default="charts", help="Output directory (default: charts)")
+    parser.add_argument("--chart", action="append", choices=sorted(CHARTS), help="Chart to render; repeat for several (default: all)")
+    parser.add_argument("--format", action="append", choices=FORMATS, dest="formats", help="Image format; repeat for several (default: png and svg)")
+    parser.add_argument("--per-month", action="store_true", help="Also render each chart for every calendar month")
+    parser.add_argument("--per-session", action="store_true", help="Also render each chart for every single session")
+    parser.add_argument("--metrics", help="Session metrics file for the metrics charts (default: <input>.metrics.json)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="Re-render even when outputs are up to date")
+
+    args = parser.parse_args(argv)
+
+    rendered, skipped = render_all(args.input_file, args.out, args.chart, tuple(args.formats or FORMATS),
+                                   args.per_month, args.per_session, args.workers, args.force, args.metrics)
+    print(f"Rendered {rendered} files, {skipped} up to date, in {args.out}")
+
+if __name__ == "__main__":
+    main()
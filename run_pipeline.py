@@ -0,0 +1,184 @@
+import os
+import ast
+import json
+import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from session_io import file_hash
+
+# Every stage names its upstream stages, the files it reads and the files it
+# writes. A stage reruns only when the content hash of an input differs from
+# the last successful run or an output is missing or was changed since;
+# stages whose upstream stages are done run concurrently.
+
+STATE_FILE = '.pipeline_state.json'
+# render_charts.CACHE_FILE, the record of what the render stage wrote
+RENDER_CACHE_FILE = '.render_cache.json'
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The modules each stage runs. A stage's own code counts as an input: these
+# and every project module they import, directly or not, are hashed with its
+# other inputs, so editing any of them reruns the stage
+STAGE_MODULES = {
+    'parse': ['generate_json_file'],
+    'interpolate': ['interpolate_climbing_data'],
+    'metrics': ['session_metrics'],
+    # render_charts loads its chart modules by name, not with an import statement
+    'render': ['render_charts', 'climbing_graph_code', 'grid_graph'],
+}
+
+class Stage:
+    def __init__(self, name, run, inputs, outputs, after=()):
+        self.name = name
+        self.run = run
+        self.inputs = inputs    # callable returning the input paths
+        self.outputs = outputs  # list of output paths
+        self.after = tuple(after)
+
+def hash_files(paths):
+    return {path: file_hash(path) if os.path.exists(path) else None for path in paths}
+
+def load_state(state_file):
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file, 'r') as f:
+        return json.load(f)
+
+def save_state(state_file, state):
+    tmp_path = state_file + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, state_file)
+
+def is_stale(stage, state):
+    recorded = state.get(stage.name)
+    if recorded is None:
+        return True
+    if hash_files(stage.inputs()) != recorded['inputs']:
+        return True
+    return hash_files(stage.outputs) != recorded['outputs']
+
+@functools.lru_cache(maxsize=None)
+def project_imports(names):
+    """The named modules and every project module they import, directly or not.
+
+    Found by parsing their import statements, including those inside
+    functions, so nothing is imported and the list cannot drift from the code.
+    Parsed once per run.
+    """
+    found = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        path = os.path.join(SCRIPT_DIR, name + '.py')
+        if name in found or not os.path.exists(path):
+            continue
+        found.add(name)
+        with open(path, 'r') as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                pending.append(node.module)
+    return sorted(found)
+
+def sources(stage):
+    return [os.path.join(SCRIPT_DIR, name + '.py') for name in project_imports(tuple(STAGE_MODULES[stage]))]
+
+def build_stages(logs, results, interpolated, metrics, charts, workers=1):
+    from generate_json_file import list_log_files
+
+    # The heavier modules are imported by the stage that needs them, so a
+    # run where everything is fresh only hashes files
+    def parse():
+        from generate_json_file import process_folder_incremental
+        process_folder_incremental(logs, results, workers=workers)
+
+    def interpolate():
+        from interpolate_climbing_data import interpolate_file
+        interpolate_file(results, interpolated)
+
+    def derive_metrics():
+        from session_metrics import compute_metrics, load_boulder_data, save_metrics, source_signature
+        save_metrics(metrics, compute_metrics(load_boulder_data(results)), source_signature(results))
+
+    def render():
+        from render_charts import render_all
+        rendered, skipped = render_all(results, charts, workers=workers, metrics_path=metrics)
+        print(f"Rendered {rendered} chart files, {skipped} up to date")
+
+    return [
+        Stage('parse', parse, lambda: list_log_files(logs) + sources('parse'), [results]),
+        Stage('interpolate', interpolate, lambda: [results] + sources('interpolate'), [interpolated], after=['parse']),
+        Stage('metrics', derive_metrics, lambda: [results] + sources('metrics'), [metrics], after=['parse']),
+        # The metrics charts draw from the sidecar the metrics stage wrote
+        Stage('render', render, lambda: [results, metrics] + sources('render'),
+              [os.path.join(charts, RENDER_CACHE_FILE)], after=['metrics']),
+    ]
+
+def run_pipeline(stages, state_file=STATE_FILE, force=False, dry_run=False, parallel=True):
+    """Run stale stages, each once its upstream stages finished; returns {stage: 'ran' | 'fresh' | 'stale'}.
+
+    A stage downstream of one that ran is checked after it, so it sees the
+    new hashes of the files it reads.
+    """
+    state = {} if force else load_state(state_file)
+    status = {}
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+
+    def record(stage):
+        state[stage.name] = {'inputs': hash_files(stage.inputs()), 'outputs': hash_files(stage.outputs)}
+        save_state(state_file, state)
+
+    with ThreadPoolExecutor(max_workers=len(stages) if parallel else 1) as executor:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if not all(upstream in status for upstream in stage.after):
+                    continue
+                del pending[name]
+                if dry_run and any(status[upstream] == 'stale' for upstream in stage.after):
+                    # Would rerun once its upstream stage rewrote its inputs
+                    status[name] = 'stale'
+                elif not is_stale(stage, state):
+                    status[name] = 'fresh'
+                elif dry_run:
+                    status[name] = 'stale'
+                else:
+                    print(f"Running {name}")
+                    running[executor.submit(stage.run)] = stage
+            if not running:
+                if pending and not any(all(upstream in status for upstream in stage.after) for stage in pending.values()):
+                    raise ValueError(f"Stages with unknown upstream stages: {', '.join(pending)}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                future.result()
+                record(stage)
+                status[stage.name] = 'ran'
+    return status
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse logs, interpolate, derive metrics and render charts, rerunning only stale stages")
+    parser.add_argument("logs", nargs="?", default="climbing_logs", help="Folder of climbing log files (default: climbing_logs)")
+    parser.add_argument("-o", "--output", default="climbing_results.json", help="Parsed sessions (default: climbing_results.json)")
+    parser.add_argument("--interpolated", default="climbing_interpolated.json", help="Interpolated sessions (default: climbing_interpolated.json)")
+    parser.add_argument("--metrics", help="Session metrics file (default: <output>.metrics.json)")
+    parser.add_argument("--charts", default="charts", help="Chart output directory (default: charts)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for parsing and rendering (default: 1)")
+    parser.add_argument("--force", action="store_true", help="Rerun every stage")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages are stale")
+
+    args = parser.parse_args()
+
+    metrics = args.metrics or os.path.splitext(args.output)[0] + '.metrics.json'
+    stages = build_stages(args.logs, args.output, args.interpolated, metrics, args.charts, args.workers)
+    status = run_pipeline(stages, force=args.force, dry_run=args.dry_run)
+    for stage in stages:
+        print(f"{stage.name}: {status.get(stage.name, 'skipped')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import sqlite3
+import argparse
+
+from grade_codec import grade_code, grade_name
+from session_io import SENDS, ATTEMPTS, grade_counts, iter_sessions
+
+# One row per session and one row per climb. Dates are ISO strings, so they
+# sort and compare correctly as text and range queries can use the indexes.
+# Climbs store the grade_codec code (an ordinal within each scale) and
+# sent = 1 for a send, 0 for an unsent attempt.
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    type TEXT NOT NULL,
+    time INTEGER NOT NULL,
+    cal INTEGER NOT NULL,
+    UNIQUE (date, type)
+);
+CREATE INDEX IF NOT EXISTS sessions_type_date ON sessions (type, date);
+CREATE INDEX IF NOT EXISTS sessions_date ON sessions (date);
+
+CREATE TABLE IF NOT EXISTS climbs (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    grade INTEGER NOT NULL,
+    sent INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS climbs_session ON climbs (session_id, grade);
+'''
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.executescript(SCHEMA)
+    return conn
+
+def insert_session(conn, session):
+    # Replaces any earlier copy of the same session, climbs included
+    conn.execute('DELETE FROM sessions WHERE date = ? AND type = ?', (session['date'], session['type']))
+    cursor = conn.execute(
+        'INSERT INTO sessions (date, type, time, cal) VALUES (?, ?, ?, ?)',
+        (session['date'], session['type'], session['time'], session['cal'])
+    )
+    session_id = cursor.lastrowid
+    rows = []
+    for grade, counts in grade_counts(session).items():
+        code = grade_code(grade)
+        rows.extend([(session_id, code, 1)] * counts[SENDS])
+        rows.extend([(session_id, code, 0)] * counts[ATTEMPTS])
+    conn.executemany('INSERT INTO climbs (session_id, grade, sent) VALUES (?, ?, ?)', rows)
+    return session_id
+
+def delete_sessions(conn, keys):
+    # keys are (date, type) pairs
+    conn.executemany('DELETE FROM sessions WHERE date = ? AND type = ?', keys)
+
+def iter_saved(conn, sessions):
+    """Insert each session as it streams past and yield it on unchanged.
+
+    Lets a writer produce JSON and SQLite output from one pass; the caller
+    commits once the stream is exhausted.
+    """
+    for session in sessions:
+        insert_session(conn, session)
+        yield session
+
+def write_sessions_db(db_path, sessions, replace=True):
+    conn = connect(db_path)
+    with conn:
+        if replace:
+            conn.execute('DELETE FROM sessions')
+        count = sum(1 for _ in iter_saved(conn, sessions))
+    conn.close()
+    return count
+
+def query_sessions(conn, climb_type=None, start=None, end=None):
+    """Sessions of a type within [start, end), served from the (type, date) index.
+
+    start and end are ISO date strings such as '2024-03' or '2024-03-01';
+    any of the filters may be left out.
+    """
+    clauses = []
+    params = []
+    if climb_type is not None:
+        clauses.append('type = ?')
+        params.append(climb_type)
+    if start is not None:
+        clauses.append('date >= ?')
+        params.append(start)
+    if end is not None:
+        clauses.append('date < ?')
+        params.append(end)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    return conn.execute(f'SELECT id, date, type, time, cal FROM sessions {where} ORDER BY date', params).fetchall()
+
+def _select(conn, session_ids):
+    # Selections can be far larger than SQLite's bound-parameter limit, so they go through a temp table
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS selected (id INTEGER PRIMARY KEY)')
+    conn.execute('DELETE FROM selected')
+    conn.executemany('INSERT OR IGNORE INTO selected (id) VALUES (?)', ((int(session_id),) for session_id in session_ids))
+
+def grade_totals(conn, session_ids):
+    """Return [(grade, sends, attempts)] over the given sessions, easiest grade first."""
+    _select(conn, session_ids)
+    rows = conn.execute(
+        'SELECT grade, SUM(sent), SUM(1 - sent) FROM climbs '
+        'WHERE session_id IN (SELECT id FROM selected) GROUP BY grade ORDER BY grade'
+    ).fetchall()
+    return [(grade_name(grade), sends, attempts) for grade, sends, attempts in rows]
+
+def session_totals(conn, session_ids):
+    """Return the count, total and mean duration, and total calories of the given sessions."""
+    _select(conn, session_ids)
+    row = conn.execute(
+        'SELECT COUNT(*), COALESCE(SUM(time), 0), AVG(time), COALESCE(SUM(cal), 0) FROM sessions '
+        'WHERE id IN (SELECT id FROM selected)'
+    ).fetchone()
+    return {'sessions': row[0], 'time': row[1], 'avg_time': row[2], 'cal': row[3]}
+
+def session_climbs(conn, session_ids):
+    """Return {session_id: (climbed, attempted)} grade lists for the given sessions."""
+    _select(conn, session_ids)
+    climbs = {row[0]: ([], []) for row in conn.execute('SELECT id FROM selected')}
+    rows = conn.execute(
+        'SELECT session_id, grade, sent FROM climbs '
+        'WHERE session_id IN (SELECT id FROM selected) ORDER BY session_id, grade'
+    )
+    for session_id, grade, sent in rows:
+        climbs[session_id][0 if sent else 1].append(grade_name(grade))
+    return climbs
+
+def sessions_frame(conn, climb_type=None, start=None, end=None):
+    """Load matching sessions as a DataFrame shaped like pd.read_json('climbing_results.json')."""
+    import pandas as pd
+
+    rows = query_sessions(conn, climb_type, start, end)
+    climbs = session_climbs(conn, [row['id'] for row in rows])
+    return pd.DataFrame([
+        {
+            'id': row['id'],
+            'type': row['type'],
+            'date': pd.Timestamp(row['date']),
+            'time': row['time'],
+            'cal': row['cal'],
+            'attempted': climbs[row['id']][1],
+            'climbed': climbs[row['id']][0],
+        }
+        for row in rows
+    ], columns=['id', 'type', 'date', 'time', 'cal', 'attempted', 'climbed'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a climbing results file into a SQLite database")
+    parser.add_argument("input_file", nargs="?", default="climbing_results.json", help="Session file, JSON array or NDJSON (default: climbing_results.json)")
+    parser.add_argument("-o", "--output", default="climbing_results.db", help="SQLite database (default: climbing_results.db)")
+
+    args = parser.parse_args()
+
+    count = write_sessions_db(args.output, iter_sessions(args.input_file, expand=False))
+    print(f"Wrote {count} sessions to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+import json
+import os
+import hashlib
+import argparse
+import itertools
+import collections
+import re
+
+# Sessions are stored either as one pretty-printed JSON array (the original
+# climbing_results.json layout) or as newline-delimited JSON, one session per line.
+JSON = 'json'
+NDJSON = 'ndjson'
+FORMATS = (JSON, NDJSON)
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+
+# In the compact schema a session's attempted/climbed lists are replaced by
+# "grades": {grade: [sends, attempts]}, run-length counts in log order.
+# As with the lists, attempts only counts the tries that did not send.
+SENDS = 0
+ATTEMPTS = 1
+
+def is_compact(session):
+    return 'grades' in session and 'climbed' not in session
+
+def _grade_order(climbed, attempted):
+    # Both lists follow the log's grade order, so merge them without reordering either
+    order = list(dict.fromkeys(climbed))
+    pos = 0
+    for grade in dict.fromkeys(attempted):
+        if grade in order:
+            pos = order.index(grade) + 1
+        else:
+            order.insert(pos, grade)
+            pos += 1
+    return order
+
+def compact_session(session):
+    if is_compact(session):
+        return session
+    climbed = session['climbed']
+    attempted = session['attempted']
+    grades = {grade: [0, 0] for grade in _grade_order(climbed, attempted)}
+    for grade in climbed:
+        grades[grade][SENDS] += 1
+    for grade in attempted:
+        grades[grade][ATTEMPTS] += 1
+    compact = {key: value for key, value in session.items() if key not in ('attempted', 'climbed')}
+    compact['grades'] = grades
+    return compact
+
+def expand_session(session):
+    if not is_compact(session):
+        return session
+    expanded = {key: value for key, value in session.items() if key != 'grades'}
+    expanded['attempted'] = [grade for grade, counts in session['grades'].items() for _ in range(counts[ATTEMPTS])]
+    expanded['climbed'] = [grade for grade, counts in session['grades'].items() for _ in range(counts[SENDS])]
+    return expanded
+
+def grade_counts(session):
+    """Return {grade: [sends, attempts]} for either schema."""
+    if is_compact(session):
+        return session['grades']
+    return compact_session(session)['grades']
+
+def send_count(session):
+    if is_compact(session):
+        return sum(counts[SENDS] for counts in session['grades'].values())
+    return len(session['climbed'])
+
+def attempt_count(session):
+    if is_compact(session):
+        return sum(counts[ATTEMPTS] for counts in session['grades'].values())
+    return len(session['attempted'])
+
+def session_key(session):
+    # Sessions are identified by their start time and climb type
+    return f"{session['date']}|{session['type']}"
+
+def file_hash(path):
+    # SHA-256 of a file's bytes, read in blocks; what every stage and watcher compares
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def format_for_path(path):
+    return NDJSON if path.endswith(NDJSON_EXTENSIONS) else JSON
+
+def detect_format(path):
+    # Sniff the first non-blank character so misnamed files still load
+    with open(path, 'r') as f:
+        while True:
+            char = f.read(1)
+            if not char:
+                return format_for_path(path)
+            if not char.isspace():
+                return JSON if char == '[' else NDJSON
+
+def _iter_ndjson(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def _iter_json_array(f, chunk_size=65536):
+    # Decode one array element at a time so the whole file is never held in memory
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size)
+    pos = 0
+    started = False
+    while True:
+        # Skip whitespace and separators, refilling the buffer as it runs out
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ',')):
+                pos += 1
+            if pos < len(buf):
+                break
+            buf = f.read(chunk_size)
+            pos = 0
+            if not buf:
+                raise json.JSONDecodeError("Unterminated session array", '', 0)
+
+        if not started:
+            if buf[pos] != '[':
+                raise json.JSONDecodeError("Expected a JSON array of sessions", buf, pos)
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == ']':
+            return
+
+        while True:
+            try:
+                session, pos = decoder.raw_decode(buf, pos)
+                break
+            except json.JSONDecodeError:
+                # The session straddles the end of the buffer
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buf = buf[pos:] + chunk
+                pos = 0
+        yield session
+
+def iter_sessions(path, expand=True):
+    """Yield sessions from a JSON array or NDJSON file one at a time.
+
+    Compact sessions are expanded back to attempted/climbed lists unless
+    expand is False, in which case each session is yielded as stored and
+    grade_counts() serves the counts for either schema.
+    """
+    fmt = detect_format(path)
+    with open(path, 'r') as f:
+        sessions = _iter_ndjson(f) if fmt == NDJSON else _iter_json_array(f)
+        if expand:
+            sessions = map(expand_session, sessions)
+        yield from sessions
+
+def load_sessions(path, expand=True):
+    return list(iter_sessions(path, expand))
+
+# Where a top-level session starts in a JSON array written by write_sessions;
+# nested lines are indented further, so only array elements match
+_ARRAY_ELEMENT = re.compile(rb'[\[,]\n  \{')
+
+def _tail_ndjson(data, count, whole):
+    lines = data.split(b'\n')
+    if not whole:
+        lines = lines[1:]  # May start mid-line
+    lines = [line for line in lines if line.strip()]
+    if len(lines) < count and not whole:
+        return None
+    return [json.loads(line) for line in lines[-count:]]
+
+def _tail_json_array(data, count, whole):
+    starts = [match.end() - 1 for match in _ARRAY_ELEMENT.finditer(data)]
+    if len(starts) < count and not whole:
+        return None
+    starts = starts[-count:]
+    text = data[starts[0]:].decode('utf-8') if starts else data.decode('utf-8')
+    # Check the elements run back to back up to the closing bracket, so a
+    # file laid out some other way is never misread
+    decoder = json.JSONDecoder()
+    sessions = []
+    pos = 0
+    for _ in starts:
+        session, pos = decoder.raw_decode(text, pos)
+        sessions.append(session)
+        rest = text[pos:].lstrip()
+        pos = len(text) - len(rest)
+        if rest[:1] == ',':
+            pos += 1
+            while text[pos:pos + 1].isspace():
+                pos += 1
+    if text[pos:].strip() != (']' if starts else '[]'):
+        raise ValueError("Not a session array written by write_sessions")
+    return sessions
+
+def tail_sessions(path, count, expand=True):
+    """Return the last count sessions of a file, reading only as much of its end as needed.
+
+    NDJSON files and JSON arrays laid out by write_sessions are read backwards
+    in growing blocks; any other layout falls back to streaming the whole file.
+    """
+    if count <= 0:
+        return []
+    tail = _tail_ndjson if detect_format(path) == NDJSON else _tail_json_array
+    size = os.path.getsize(path)
+    block = 65536
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                start = max(0, size - block)
+                f.seek(start)
+                sessions = tail(f.read(), count, start == 0)
+                if sessions is not None:
+                    break
+                block *= 4
+    except ValueError:
+        sessions = list(collections.deque(iter_sessions(path, expand=False), maxlen=count))
+    return [expand_session(session) for session in sessions] if expand else sessions
+
+def write_sessions(path, sessions, fmt=None):
+    """Stream sessions to path as NDJSON or a pretty JSON array.
+
+    The JSON array output is byte-for-byte what json.dump(sessions, f, indent=2)
+    produced, except that compact sessions are kept on a single line.
+
+    The file is written to a temporary name and moved into place, so readers
+    never see a partial file and path may also be the input being read.
+    Returns the number of sessions written.
+    """
+    fmt = fmt or format_for_path(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown session format: {fmt}")
+
+    count = 0
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            if fmt == NDJSON:
+                for session in sessions:
+                    f.write(json.dumps(session, ensure_ascii=False))
+                    f.write('\n')
+                    count += 1
+            else:
+                for session in sessions:
+                    f.write('[\n  ' if count == 0 else ',\n  ')
+                    if is_compact(session):
+                        f.write(json.dumps(session, ensure_ascii=False))
+                    else:
+                        f.write(json.dumps(session, indent=2).replace('\n', '\n  '))
+                    count += 1
+                f.write('\n]' if count else '[]')
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+def append_sessions(path, sessions, fmt=None):
+    """Add sessions to the end of an existing file, creating it if needed.
+
+    NDJSON files are appended to in place; JSON arrays are streamed through
+    write_sessions with the new sessions after the existing ones. Returns the
+    number of sessions appended.
+    """
+    if not os.path.exists(path):
+        return write_sessions(path, sessions, fmt)
+    fmt = fmt or detect_format(path)
+    if fmt == NDJSON and detect_format(path) == NDJSON:
+        count = 0
+        with open(path, 'a') as f:
+            for session in sessions:
+                f.write(json.dumps(session, ensure_ascii=False))
+                f.write('\n')
+                count += 1
+        return count
+    sessions = list(sessions)
+    write_sessions(path, itertools.chain(iter_sessions(path, expand=False), sessions), fmt)
+    return len(sessions)
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert climbing session files between JSON and NDJSON and between the list and compact schemas")
+    parser.add_argument("input_file", help="Input session file (JSON array or NDJSON)")
+    parser.add_argument("output_file", help="Output session file")
+    parser.add_argument("--format", choices=FORMATS, help="Output format (default: from the output file extension)")
+    schema = parser.add_mutually_exclusive_group()
+    schema.add_argument("--compact", action="store_true", help="Store grades as {grade: [sends, attempts]} counts")
+    schema.add_argument("--expand", action="store_true", help="Store grades as attempted/climbed lists")
+
+    args = parser.parse_args()
+
+    sessions = iter_sessions(args.input_file, expand=args.expand)
+    if args.compact:
+        sessions = map(compact_session, sessions)
+    count = write_sessions(args.output_file, sessions, args.format)
+    print(f"Wrote {count} sessions to {args.output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from grade_codec import to_numeric
+from grade_matrix import _flatten
+from session_io import iter_sessions
+from session_store import source_signature
+
+# Per-session columns shared by the grid chart and anything else that needs them.
+# top_20_avg is NaN for sessions with fewer than 20 sends.
+METRIC_COLUMNS = ['date', 'time', 'cal', 'total_climbs', 'v6_plus', 'avg_difficulty', 'top_20_avg']
+METRICS_VERSION = 1
+TOP_N = 20
+
+def grade_matrix(grade_lists, pad=-1):
+    """Numeric grades as a [session, longest session] matrix, short rows padded with pad."""
+    flat, rows, lengths = _flatten(grade_lists)
+    width = int(lengths.max(initial=0))
+    matrix = np.full((len(grade_lists), width), pad, dtype=np.int16)
+    # Column of each climb within its session
+    columns = np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    matrix[rows, columns] = to_numeric(flat)
+    return matrix, lengths
+
+def compute_metrics(boulder_data):
+    """Every per-session metric column in one vectorized pass over the climbed lists."""
+    matrix, lengths = grade_matrix(boulder_data['climbed'].tolist())
+    valid = matrix >= 0
+    sums = np.where(valid, matrix, 0).sum(axis=1)
+    avg_difficulty = np.divide(sums, lengths, out=np.zeros(len(lengths)), where=lengths > 0)
+
+    # The 20 hardest sends of each row via a partial sort; padding sorts last
+    # and only rows with at least 20 sends get a value
+    top_20_avg = np.full(len(lengths), np.nan)
+    if matrix.shape[1] >= TOP_N:
+        top = -np.partition(-matrix, TOP_N - 1, axis=1)[:, :TOP_N]
+        full = lengths >= TOP_N
+        top_20_avg[full] = top[full].sum(axis=1) / TOP_N
+
+    return pd.DataFrame({
+        'date': pd.to_datetime(boulder_data['date']).to_numpy(),
+        'time': boulder_data['time'].to_numpy(),
+        'cal': boulder_data['cal'].to_numpy(),
+        'total_climbs': lengths,
+        'v6_plus': (matrix >= 6).sum(axis=1),
+        'avg_difficulty': avg_difficulty,
+        'top_20_avg': top_20_avg,
+    }, columns=METRIC_COLUMNS)
+
+def metrics_path_for(json_path):
+    return os.path.splitext(json_path)[0] + '.metrics.json'
+
+def save_metrics(metrics_path, metrics, source=None):
+    # One record per session; NaN is stored as null
+    records = json.loads(metrics.to_json(orient='records', date_format='iso'))
+    tmp_path = metrics_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': METRICS_VERSION, 'source': source, 'sessions': records}, f, indent=2)
+    os.replace(tmp_path, metrics_path)
+
+def load_metrics(metrics_path):
+    with open(metrics_path, 'r') as f:
+        data = json.load(f)
+    metrics = pd.DataFrame(data['sessions'], columns=METRIC_COLUMNS)
+    metrics['date'] = pd.to_datetime(metrics['date'])
+    metrics['top_20_avg'] = metrics['top_20_avg'].astype(float)
+    return metrics, data
+
+def load_boulder_data(json_path='climbing_results.json'):
+    # Boulder sessions only, without the first one; shared by the chart scripts.
+    # Read through session_io so NDJSON files and compact sessions load too
+    climbing_data = pd.DataFrame(iter_sessions(json_path))
+    climbing_data['date'] = pd.to_datetime(climbing_data['date'])
+    return climbing_data[climbing_data['type'] == 'Boulder'].iloc[1:].reset_index(drop=True)
+
+def load_or_compute_metrics(json_path, metrics_path=None):
+    """Read the sidecar metrics file, recomputing it only when json_path changed since it was written."""
+    metrics_path = metrics_path or metrics_path_for(json_path)
+    source = source_signature(json_path)
+    if os.path.exists(metrics_path):
+        metrics, data = load_metrics(metrics_path)
+        if data.get('version') == METRICS_VERSION and data.get('source') == source:
+            return metrics
+    metrics = compute_metrics(load_boulder_data(json_path))
+    save_metrics(metrics_path, metrics, source)
+    return metrics
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the per-session metrics sidecar for a climbing results file")
+    parser.add_argument("input_file", nargs="?", default="climbing_results.json", help="Session file (default: climbing_results.json)")
+    parser.add_argument("-o", "--output", help="Metrics file (default: <input>.metrics.json)")
+
+    args = parser.parse_args()
+
+    output = args.output or metrics_path_for(args.input_file)
+    metrics = compute_metrics(load_boulder_data(args.input_file))
+    save_metrics(output, metrics, source_signature(args.input_file))
+    print(f"Wrote metrics for {len(metrics)} sessions to {output}")
+
+if __name__ == "__main__":
+    main()
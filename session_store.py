@@ -0,0 +1,162 @@
+import json
+import os
+import argparse
+import shutil
+from array import array
+
+import numpy as np
+
+from grade_codec import GRADES, grade_code
+from session_io import SENDS, ATTEMPTS, grade_counts, iter_sessions
+
+# A session store is a directory of .npy columns that np.load can memory-map:
+#
+#   date.npy             int64   session start, seconds since the epoch
+#   type.npy             uint8   index into meta.json "types"
+#   time.npy, cal.npy    int32
+#   sent.npy             uint8   grade codes of every send, session after session
+#   sent_offsets.npy     int64   session i's sends are sent[sent_offsets[i]:sent_offsets[i + 1]]
+#   attempted.npy        uint8   grade codes of every unsent attempt
+#   attempted_offsets.npy int64
+#
+# meta.json holds the type names, the grade code table and the source file's
+# size and mtime so a stale store can be detected.
+STORE_VERSION = 1
+COLUMNS = ('date', 'type', 'time', 'cal', 'sent', 'sent_offsets', 'attempted', 'attempted_offsets')
+
+def store_path_for(json_path):
+    return os.path.splitext(json_path)[0] + '.store'
+
+def build_columns(sessions):
+    """Flatten sessions into column arrays in a single pass over the stream."""
+    dates = []
+    types = {}
+    type_codes = array('B')
+    times = array('i')
+    cals = array('i')
+    sent = array('B')
+    attempted = array('B')
+    sent_offsets = array('q', [0])
+    attempted_offsets = array('q', [0])
+
+    for session in sessions:
+        dates.append(session['date'])
+        type_codes.append(types.setdefault(session['type'], len(types)))
+        times.append(session['time'])
+        cals.append(session['cal'])
+        for grade, counts in grade_counts(session).items():
+            code = grade_code(grade)
+            sent.extend([code] * counts[SENDS])
+            attempted.extend([code] * counts[ATTEMPTS])
+        sent_offsets.append(len(sent))
+        attempted_offsets.append(len(attempted))
+
+    columns = {
+        'date': np.array(dates, dtype='datetime64[s]').astype(np.int64),
+        'type': np.frombuffer(type_codes, dtype=np.uint8),
+        'time': np.frombuffer(times, dtype=np.int32),
+        'cal': np.frombuffer(cals, dtype=np.int32),
+        'sent': np.frombuffer(sent, dtype=np.uint8),
+        'sent_offsets': np.frombuffer(sent_offsets, dtype=np.int64),
+        'attempted': np.frombuffer(attempted, dtype=np.uint8),
+        'attempted_offsets': np.frombuffer(attempted_offsets, dtype=np.int64),
+    }
+    return columns, list(types)
+
+def save_arrays(path, arrays, meta):
+    """Write arrays as .npy files plus meta.json to the directory path, replacing it.
+
+    The files are written to a scratch directory and renamed into place, so
+    processes that have the old arrays memory-mapped keep valid pages and
+    never see a mix. meta.json is written last and lists the array names.
+    """
+    tmp_path = path + '.tmp'
+    old_path = path + '.old'
+    for stale in (tmp_path, old_path):
+        if os.path.exists(stale):
+            shutil.rmtree(stale)
+    os.makedirs(tmp_path)
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_path, name + '.npy'), np.ascontiguousarray(values))
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(dict(meta, arrays=sorted(arrays)), f, indent=2)
+
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+
+def load_arrays(path, names=None, mmap=True):
+    """Load the arrays saved by save_arrays (or only names) plus the meta dict.
+
+    With mmap the arrays are read-only views of the files on disk, so loading
+    copies nothing and several processes share the same pages.
+    """
+    with open(os.path.join(path, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+    mode = 'r' if mmap else None
+    names = meta['arrays'] if names is None else names
+    return {name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mode) for name in names}, meta
+
+def save_store(store_path, columns, types, source=None):
+    meta = {
+        'version': STORE_VERSION,
+        'sessions': len(columns['date']),
+        'types': types,
+        'grades': GRADES,
+        'source': source,
+    }
+    save_arrays(store_path, {name: columns[name] for name in COLUMNS}, meta)
+
+def load_store(store_path, mmap=True):
+    """Load a session store as a dict of NumPy arrays plus its meta dict, memory-mapped unless mmap is False."""
+    columns, meta = load_arrays(store_path, COLUMNS, mmap)
+    if meta['version'] != STORE_VERSION:
+        raise ValueError(f"Unsupported session store version {meta['version']} in {store_path}")
+    return columns, meta
+
+def source_signature(json_path):
+    stat = os.stat(json_path)
+    return {'path': os.path.abspath(json_path), 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+def store_is_fresh(store_path, json_path):
+    meta_path = os.path.join(store_path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    return meta.get('version') == STORE_VERSION and meta.get('source') == source_signature(json_path)
+
+def build_store(json_path, store_path=None):
+    store_path = store_path or store_path_for(json_path)
+    columns, types = build_columns(iter_sessions(json_path, expand=False))
+    save_store(store_path, columns, types, source_signature(json_path))
+    return store_path
+
+def load_or_build_store(json_path, store_path=None, mmap=True):
+    # Rebuild only when the session file changed since the store was written
+    store_path = store_path or store_path_for(json_path)
+    if not store_is_fresh(store_path, json_path):
+        build_store(json_path, store_path)
+    return load_store(store_path, mmap)
+
+def session_climbs(columns, index):
+    # Grade codes of one session's sends and unsent attempts, as views
+    sent = columns['sent'][columns['sent_offsets'][index]:columns['sent_offsets'][index + 1]]
+    attempted = columns['attempted'][columns['attempted_offsets'][index]:columns['attempted_offsets'][index + 1]]
+    return sent, attempted
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a columnar NumPy session store from a climbing results file")
+    parser.add_argument("input_file", nargs="?", default="climbing_results.json", help="Session file, JSON array or NDJSON (default: climbing_results.json)")
+    parser.add_argument("-o", "--output", help="Store directory (default: <input>.store)")
+
+    args = parser.parse_args()
+
+    store_path = build_store(args.input_file, args.output)
+    columns, meta = load_store(store_path)
+    print(f"Stored {meta['sessions']} sessions and {len(columns['sent']) + len(columns['attempted'])} climbs in {store_path}")
+
+if __name__ == "__main__":
+    main()
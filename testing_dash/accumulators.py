@@ -0,0 +1,217 @@
+import heapq
+import numpy as np
+from collections import Counter
+from utils import v_grade_to_numeric
+from calculate_session_stats import format_session_stats
+from session_cube import TOP_N, AVERAGE_SCALE
+
+class GradeStats:
+    """Count, sum, min, max, per-grade histogram and the top_k highest grades.
+
+    Two GradeStats merge into the stats of both inputs, so stats for any set
+    of climbs can be built from stats over its parts.
+    """
+
+    def __init__(self, top_k=TOP_N):
+        self.top_k = top_k
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.histogram = Counter()
+        self.top = []  # min-heap holding the top_k highest grades
+
+    def add(self, grade, count=1):
+        self.count += count
+        self.total += grade * count
+        self.min = grade if self.min is None else min(self.min, grade)
+        self.max = grade if self.max is None else max(self.max, grade)
+        self.histogram[grade] += count
+        for _ in range(min(count, self.top_k)):
+            if len(self.top) < self.top_k:
+                heapq.heappush(self.top, grade)
+            elif grade > self.top[0]:
+                heapq.heapreplace(self.top, grade)
+            else:
+                break
+        return self
+
+    def update(self, grades):
+        for grade in grades:
+            self.add(grade)
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self.histogram.update(other.histogram)
+        self.top = heapq.nlargest(self.top_k, self.top + other.top)
+        heapq.heapify(self.top)
+        return self
+
+    def __add__(self, other):
+        return GradeStats(self.top_k).merge(self).merge(other)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def count_at_least(self, grade):
+        return sum(count for value, count in self.histogram.items() if value >= grade)
+
+    def grades(self):
+        # Every grade counted, easiest first
+        return sorted(self.histogram.elements())
+
+    def to_dict(self):
+        return {'top_k': self.top_k, 'count': self.count, 'total': self.total, 'min': self.min, 'max': self.max,
+                'histogram': dict(self.histogram), 'top': sorted(self.top, reverse=True)}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls(data['top_k'])
+        stats.count = data['count']
+        stats.total = data['total']
+        stats.min = data['min']
+        stats.max = data['max']
+        stats.histogram = Counter({int(grade): count for grade, count in data['histogram'].items()})
+        stats.top = list(data['top'])
+        heapq.heapify(stats.top)
+        return stats
+
+def session_average_scaled(sent):
+    """calculate_session_average for one session's sends, as (average * AVERAGE_SCALE, 1).
+
+    Returns (0, 0) when the session has no average, so the pair can be summed.
+    """
+    hard = {grade: count for grade, count in sent.histogram.items() if grade > 3}
+    if not hard:
+        return 0, 0
+    if sent.count <= TOP_N:
+        # 20 or fewer climbs: mean of every climb above V3
+        numerator, denominator = sum(grade * count for grade, count in hard.items()), sum(hard.values())
+    else:
+        numerator, denominator = sum(sent.top), TOP_N
+    return numerator * (AVERAGE_SCALE // denominator), 1
+
+class SessionStats:
+    """Mergeable accumulator behind the session-analysis table.
+
+    Build one per session with from_session, then merge any selection,
+    month or worker's share together; stats() formats the result the way
+    calculate_session_stats does. The top-20 average is summed exactly, so a
+    mean that lands exactly on a .x5 tie can round differently from np.mean's;
+    selection_stats passes the np.mean value to match it.
+    """
+
+    def __init__(self):
+        self.sent = GradeStats()
+        self.attempted = GradeStats()
+        self.sessions = 0
+        self.time = 0
+        self.cal = 0
+        self.average_sum = 0
+        self.average_count = 0
+
+    @classmethod
+    def from_session(cls, session):
+        stats = cls()
+        stats.sent.update(v_grade_to_numeric(grade) for grade in session['climbed'])
+        stats.attempted.update(v_grade_to_numeric(grade) for grade in session['attempted'])
+        stats.sessions = 1
+        stats.time = int(session['time'])
+        stats.cal = int(session['cal'])
+        stats.average_sum, stats.average_count = session_average_scaled(stats.sent)
+        return stats
+
+    def merge(self, other):
+        self.sent.merge(other.sent)
+        self.attempted.merge(other.attempted)
+        self.sessions += other.sessions
+        self.time += other.time
+        self.cal += other.cal
+        self.average_sum += other.average_sum
+        self.average_count += other.average_count
+        return self
+
+    def __add__(self, other):
+        return SessionStats().merge(self).merge(other)
+
+    def stats(self, num_sessions=None, top20_average=None):
+        # num_sessions overrides the merged session count for 'Number of Sessions'
+        # and climbs per session, as calculate_session_stats counts every selected id;
+        # top20_average overrides the exact mean, as in PrefixIndex.stats
+        if self.sent.count + self.attempted.count == 0:
+            return None
+        if top20_average is None and self.average_count:
+            top20_average = np.float64(self.average_sum) / (AVERAGE_SCALE * self.average_count)
+        # Means are np.float64 like np.mean's, so round() formats them the same way
+        return format_session_stats(
+            total_completed=self.sent.count,
+            total_attempts=self.attempted.count,
+            average_grade=np.float64(self.sent.mean) if self.sent.count else None,
+            hardest_send=self.sent.max,
+            top20_average=top20_average,
+            v6_plus=self.sent.count_at_least(6),
+            num_sessions=self.sessions if num_sessions is None else num_sessions,
+            total_time=self.time,
+            average_time=np.float64(self.time) / self.sessions,
+            total_cal=self.cal
+        )
+
+    def to_dict(self):
+        return {'sent': self.sent.to_dict(), 'attempted': self.attempted.to_dict(), 'sessions': self.sessions,
+                'time': self.time, 'cal': self.cal, 'average_sum': self.average_sum, 'average_count': self.average_count}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.sent = GradeStats.from_dict(data['sent'])
+        stats.attempted = GradeStats.from_dict(data['attempted'])
+        for name in ('sessions', 'time', 'cal', 'average_sum', 'average_count'):
+            setattr(stats, name, data[name])
+        return stats
+
+def session_accumulators(boulder_data):
+    """{session_id: SessionStats} for every session, built in one pass."""
+    return {session['session_id']: SessionStats.from_session(session)
+            for session in boulder_data.to_dict('records')}
+
+def merge_sessions(accumulators, session_ids):
+    """Merge the per-session accumulators of a selection the way calculate_session_stats counts it.
+
+    Climbs, time and calories count each session once; the top-20 average
+    counts a session once per time it is listed. Unknown ids are skipped.
+    """
+    session_ids = [session_id for session_id in session_ids if session_id in accumulators]
+    merged = SessionStats()
+    for session_id in dict.fromkeys(session_ids):
+        merged.merge(accumulators[session_id])
+    merged.average_sum = sum(accumulators[session_id].average_sum for session_id in session_ids)
+    merged.average_count = sum(accumulators[session_id].average_count for session_id in session_ids)
+    return merged
+
+def selection_stats(accumulators, session_ids):
+    """Same result as calculate_session_stats(boulder_data, session_ids), from merged accumulators."""
+    session_ids = list(session_ids)
+    merged = merge_sessions(accumulators, session_ids)
+    # np.mean over the session averages in selection order, as calculate_session_stats
+    # takes it, so ties round the same way; each scaled average divides back exactly
+    averages = [accumulators[session_id].average_sum / AVERAGE_SCALE for session_id in session_ids
+                if session_id in accumulators and accumulators[session_id].average_count]
+    top20_average = np.mean(averages) if averages else None
+    stats = merged.stats(len(session_ids), top20_average) if merged.sessions else None
+    if stats is None:
+        return None
+    return stats, merged.sent.grades(), merged.attempted.grades()
+
+def bucket_accumulators(boulder_data, accumulators, freq='M'):
+    """{period: SessionStats} merging every session in each calendar period."""
+    periods = boulder_data['date'].dt.to_period(freq)
+    buckets = {}
+    for session_id, period in zip(boulder_data['session_id'], periods):
+        buckets.setdefault(period, SessionStats()).merge(accumulators[session_id])
+    return buckets
@@ -1,41 +1,150 @@
-from dash import Dash, html
+import os
+from dash import Dash, html, no_update
 from dash.dependencies import Input, Output
-from graph1 import create_graph1
-from graph2 import create_graph2, create_session_analysis_figure
+from graph1 import create_graph1, timeline_data, use_webgl, visible_points, timeline_patch
+from graph2 import create_graph2, session_analysis_data, session_analysis_patch
+from session_cube import SessionCube
+from figure_cache import FigureCache
+from data_watcher import DataWatcher
+from shared_store import load_or_build
+from session_metrics import load_boulder_data
+import numpy as np
 import pandas as pd
 
-app = Dash(__name__)
-
-# Load data once at startup
-climbing_data = pd.read_json('climbing_results.json')
-boulder_data = climbing_data[climbing_data['type'] == 'Boulder'].iloc[1:].reset_index(drop=True)
-boulder_data['session_id'] = range(len(boulder_data))
-
-app.layout = html.Div([
-    create_graph1(),
-    create_graph2(boulder_data)
-])
-
-@app.callback(
-    Output('session-analysis-graph', 'figure'),
-    [Input('timeline-graph', 'selectedData'),
-     Input('timeline-graph', 'clickData')]  # Added clickData
-)
-def update_session_analysis(selected_data, click_data):
-    if selected_data:
-        # Get indices of selected points
-        selected_indices = [point['pointIndex'] for point in selected_data['points']]
-        print(f"Selected indices: {selected_indices}")  # Debug print
-        return create_session_analysis_figure(boulder_data, selected_indices)
-    elif click_data:
-        # Handle single click
-        index = click_data['points'][0]['pointIndex']
-        print(f"Clicked index: {index}")  # Debug print
-        return create_session_analysis_figure(boulder_data, [index])
+DATA_FILE = 'climbing_results.json'
+
+# What the skeleton shows for a selection without any climbs
+EMPTY_ANALYSIS = {'grades': [], 'completed': [], 'attempted': [], 'table_cells': [[], [], [''] * 12]}
+
+def load_sessions(path):
+    boulder_data = load_boulder_data(path)
+    boulder_data['session_id'] = range(len(boulder_data))
+    return boulder_data
+
+def build_arrays(path):
+    # Everything a worker needs, as plain arrays for the shared store
+    boulder_data = load_sessions(path)
+    dates, total_climbs, avg_difficulties = timeline_data(boulder_data)
+    arrays = SessionCube(boulder_data).to_arrays()
+    arrays['timeline_dates'] = dates.to_numpy(dtype='datetime64[ns]')
+    arrays['timeline_climbs'] = np.asarray(total_climbs, dtype=np.int64)
+    arrays['timeline_avg'] = np.asarray(avg_difficulties, dtype=np.float64)
+    return arrays
+
+class DataSnapshot:
+    """Everything the callbacks derive from one version of the data file.
+
+    Built completely before the watcher swaps it in, and never modified
+    afterwards apart from its own figure cache.
+    """
+
+    def __init__(self, version, cube, timeline):
+        self.cube = cube
+        self.timeline = timeline
+        self.figures = FigureCache(version, maxsize=128)
+        # Warm the default view so the first request after a swap is not a cold miss
+        self.analysis(self.all_sessions())
+
+    @classmethod
+    def from_file(cls, path, version):
+        boulder_data = load_sessions(path)
+        return cls(version, SessionCube(boulder_data), timeline_data(boulder_data))
+
+    @classmethod
+    def from_store(cls, path, version, store_root):
+        # Arrays are memory-mapped read-only from the shared store
+        arrays = load_or_build(store_root, version, lambda: build_arrays(path))
+        timeline = (pd.DatetimeIndex(arrays['timeline_dates']), arrays['timeline_climbs'], arrays['timeline_avg'])
+        return cls(version, SessionCube.from_arrays(arrays), timeline)
+
+    def all_sessions(self):
+        return range(len(self.cube.session_ids))
+
+    def analysis(self, session_ids):
+        return self.figures.get(session_ids, lambda ids: session_analysis_data(None, ids, self.cube))
+
+def store_root_for(data_file):
+    return os.path.splitext(data_file)[0] + '.dash.store'
+
+def create_app(data_file=DATA_FILE, shared=False, store_root=None, watch_interval=2.0):
+    """Build the dashboard app.
+
+    With shared the session arrays come from a memory-mapped store under
+    store_root (default <data file>.dash.store), built once by whichever
+    worker gets there first; every process of a multi-worker WSGI server
+    then maps the same read-only pages instead of holding its own copy.
+    """
+    app = Dash(__name__)
+
+    if shared:
+        store_root = store_root or store_root_for(data_file)
+        load = lambda path, version: DataSnapshot.from_store(path, version, store_root)
     else:
-        # Default to showing all sessions
-        print("No selection, showing all")  # Debug print
-        return create_session_analysis_figure(boulder_data, range(len(boulder_data)))
+        load = DataSnapshot.from_file
+    # Loaded once at startup; the watcher thread reloads it when the file changes
+    watcher = DataWatcher(data_file, load, interval=watch_interval).start()
+    app.watcher = watcher
+
+    def session_analysis_figure(data, session_ids):
+        # The figure is built once by create_graph2; selections only patch its data
+        analysis = data.analysis(session_ids)
+        return session_analysis_patch(analysis if analysis is not None else EMPTY_ANALYSIS)
+
+    def serve_layout():
+        # A function, so each page load gets the current snapshot
+        data = watcher.snapshot
+        return html.Div([
+            create_graph1(timeline=data.timeline),
+            create_graph2(None, data.all_sessions(), cube=data.cube, data=data.analysis(data.all_sessions()))
+        ])
+
+    app.layout = serve_layout
+
+    @app.callback(
+        Output('session-analysis-graph', 'figure'),
+        [Input('timeline-graph', 'selectedData'),
+         Input('timeline-graph', 'clickData')]  # Added clickData
+    )
+    def update_session_analysis(selected_data, click_data):
+        data = watcher.snapshot
+        if selected_data:
+            # Get indices of selected points
+            # customdata holds the session id; the downsampled WebGL timeline's point indices are not session ids
+            selected_indices = [point.get('customdata', point['pointIndex']) for point in selected_data['points']]
+            print(f"Selected indices: {selected_indices}")  # Debug print
+            return session_analysis_figure(data, selected_indices)
+        elif click_data:
+            # Handle single click
+            index = click_data['points'][0].get('customdata', click_data['points'][0]['pointIndex'])
+            print(f"Clicked index: {index}")  # Debug print
+            return session_analysis_figure(data, [index])
+        else:
+            # Default to showing all sessions
+            print("No selection, showing all")  # Debug print
+            return session_analysis_figure(data, data.all_sessions())
+
+    @app.callback(
+        Output('timeline-graph', 'figure'),
+        Input('timeline-graph', 'relayoutData'),
+        prevent_initial_call=True
+    )
+    def refine_timeline(relayout_data):
+        # Large timelines are downsampled; redraw the visible window at full detail on zoom
+        dates, total_climbs, avg_difficulties = watcher.snapshot.timeline
+        if not relayout_data or not use_webgl(dates):
+            return no_update
+        if relayout_data.get('xaxis.autorange'):
+            start, end = None, None
+        elif 'xaxis.range[0]' in relayout_data:
+            start, end = relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+        elif 'xaxis.range' in relayout_data:
+            start, end = relayout_data['xaxis.range']
+        else:
+            return no_update
+        indices = visible_points(dates, avg_difficulties, start, end)
+        return timeline_patch(dates, total_climbs, avg_difficulties, indices)
+
+    return app
 
 if __name__ == '__main__':
-    app.run_server(debug=True)
\ No newline at end of file
+    create_app().run_server(debug=True)
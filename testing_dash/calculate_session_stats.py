@@ -28,13 +28,7 @@ def calculate_session_stats(boulder_data, session_ids):
     if not all_climbs:
         return None
         
-    # Calculate failure rate
-    total_attempts = len(attempted_climbs)
-    total_completed = len(completed_climbs)
-    failure_rate = round((total_attempts / (total_completed + total_attempts) * 100), 1) if (total_completed + total_attempts) > 0 else 0
-    
     v6_plus = len([x for x in completed_climbs if x >= 6])
-    v6_plus_percentage = round((v6_plus / len(completed_climbs)) * 100, 1) if completed_climbs else 0
     
     # Calculate session averages
     session_averages = []
@@ -48,23 +42,41 @@ def calculate_session_stats(boulder_data, session_ids):
                 if avg is not None:
                     session_averages.append(avg)
     
-    stats = {
+    return format_session_stats(
+        total_completed=len(completed_climbs),
+        total_attempts=len(attempted_climbs),
+        average_grade=np.mean(completed_climbs) if completed_climbs else None,
+        hardest_send=max(completed_climbs) if completed_climbs else None,
+        top20_average=np.mean(session_averages) if session_averages else None,
+        v6_plus=v6_plus,
+        num_sessions=len(session_ids),
+        total_time=selected_sessions['time'].sum(),
+        average_time=selected_sessions['time'].mean(),
+        total_cal=selected_sessions['cal'].sum()
+    ), completed_climbs, attempted_climbs
+
+def format_session_stats(total_completed, total_attempts, average_grade, hardest_send, top20_average,
+                         v6_plus, num_sessions, total_time, average_time, total_cal):
+    # Shared by every path that aggregates a selection, so the table reads the same
+    total_tries = total_completed + total_attempts
+    failure_rate = round((total_attempts / total_tries * 100), 1) if total_tries > 0 else 0
+    v6_plus_percentage = round((v6_plus / total_completed) * 100, 1) if total_completed else 0
+    
+    return {
         'Performance Metrics': {
-            'Total Completed': len(completed_climbs),
-            'Total Attempts': len(attempted_climbs),
+            'Total Completed': total_completed,
+            'Total Attempts': total_attempts,
             'Failure Rate': f"{failure_rate}%",
-            'Average Grade': f"V{round(np.mean(completed_climbs), 1)}" if completed_climbs else "N/A",
-            'Hardest Send': f"V{max(completed_climbs)}" if completed_climbs else "N/A",
-            'Average of Top 20': f"V{round(np.mean(session_averages), 1)}" if session_averages else "N/A",
+            'Average Grade': f"V{round(average_grade, 1)}" if average_grade is not None else "N/A",
+            'Hardest Send': f"V{hardest_send}" if hardest_send is not None else "N/A",
+            'Average of Top 20': f"V{round(top20_average, 1)}" if top20_average is not None else "N/A",
             'V6+ Percentage': f"{v6_plus_percentage}%"
         },
         'Session Data': {
-            'Number of Sessions': len(session_ids),
-            'Average Climbs/Session': round(len(completed_climbs) / len(session_ids), 1),
-            'Total Duration': f"{selected_sessions['time'].sum()} min",
-            'Average Duration': f"{round(selected_sessions['time'].mean(), 1)} min",
-            'Total Calories': f"{selected_sessions['cal'].sum()} cal"
+            'Number of Sessions': num_sessions,
+            'Average Climbs/Session': round(total_completed / num_sessions, 1),
+            'Total Duration': f"{total_time} min",
+            'Average Duration': f"{round(average_time, 1)} min",
+            'Total Calories': f"{total_cal} cal"
         }
-    }
-    
-    return stats, completed_climbs, attempted_climbs
\ No newline at end of file
+    }
\ No newline at end of file
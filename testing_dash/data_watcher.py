@@ -0,0 +1,77 @@
+import os
+import threading
+import utils  # Puts the repository root, where session_io lives, on sys.path
+from session_io import file_hash
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+class DataWatcher:
+    """Keeps the snapshot built from a data file current while the app runs.
+
+    load(path, version) builds a complete snapshot. A daemon thread polls the
+    file's size and mtime, confirms a change by its SHA-256 (so a touch or a
+    rewrite with the same bytes does not reload), builds the new snapshot
+    off the request path and then replaces self.snapshot in one assignment.
+    Readers take self.snapshot once per request and use only that object, so
+    they see either the old data or the new, never a mix.
+    """
+
+    def __init__(self, path, load, interval=2.0):
+        self.path = path
+        self.load = load
+        self.interval = interval
+        self.stamp = file_stamp(path)
+        self.version = file_hash(path)
+        self.snapshot = load(path, self.version)
+        self.reloads = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Reload if the file changed; returns True when a new snapshot was swapped in."""
+        try:
+            stamp = file_stamp(self.path)
+        except FileNotFoundError:
+            # Writers that replace the file may briefly leave no file behind
+            return False
+        if stamp == self.stamp:
+            return False
+        version = file_hash(self.path)
+        self.stamp = stamp
+        if version == self.version:
+            return False
+        try:
+            snapshot = self.load(self.path, version)
+        except ValueError as e:
+            # A half-written file fails to parse; keep serving the old snapshot,
+            # the write that completes it changes the stamp again
+            print(f"Not reloading {self.path}: {e}")
+            return False
+        self.version = version
+        self.snapshot = snapshot
+        self.reloads += 1
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # Anything load raises besides a parse error would otherwise end
+                # the thread and freeze the data; keep serving the old snapshot
+                # and reload once the file changes again
+                print(f"Not reloading {self.path}: {e!r}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='data-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
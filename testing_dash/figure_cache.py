@@ -0,0 +1,50 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+def selection_key(session_ids):
+    # Same sessions in any order give the same key; repeated ids are kept
+    # because they count towards the session total
+    ids = sorted(int(session_id) for session_id in session_ids)
+    return hashlib.sha1(','.join(map(str, ids)).encode()).hexdigest()
+
+class FigureCache:
+    """Bounded LRU cache of figures, or figure data, keyed by selection and data version.
+
+    Each data snapshot owns its cache, created with the snapshot's version,
+    so swapping in new data drops every figure built from the old data.
+    """
+
+    def __init__(self, version, maxsize=128):
+        self.version = version
+        self.maxsize = maxsize
+        self.figures = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Callbacks run on several server threads
+        self.lock = threading.Lock()
+
+    def get(self, session_ids, build):
+        """Return the cached figure for session_ids, calling build(session_ids) on a miss."""
+        key = (selection_key(session_ids), self.version)
+        with self.lock:
+            if key in self.figures:
+                self.hits += 1
+                self.figures.move_to_end(key)
+                return self.figures[key]
+            self.misses += 1
+
+        figure = build(session_ids)
+        with self.lock:
+            self.figures[key] = figure
+            if len(self.figures) > self.maxsize:
+                self.figures.popitem(last=False)
+        return figure
+
+    def clear(self):
+        with self.lock:
+            self.figures.clear()
+
+    def info(self):
+        return {'version': self.version[:12], 'hits': self.hits, 'misses': self.misses,
+                'size': len(self.figures), 'maxsize': self.maxsize}
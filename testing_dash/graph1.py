@@ -1,24 +1,80 @@
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from dash import dcc
+from dash import dcc, Patch
 from utils import calculate_average_difficulty
+from downsample import lttb
+from session_metrics import load_boulder_data
 
-def process_climbing_data(data_path):
-    climbing_data = pd.read_json(data_path)
-    boulder_data = climbing_data[climbing_data['type'] == 'Boulder'].iloc[1:].reset_index(drop=True)
-    
+# Above this many sessions the timeline switches to WebGL and is downsampled
+# to at most MAX_TIMELINE_POINTS markers for the visible range
+WEBGL_THRESHOLD = 5000
+MAX_TIMELINE_POINTS = 2000
+
+def timeline_data(boulder_data):
     dates = pd.to_datetime(boulder_data['date'])
-    total_climbs = [len(session['climbed']) for _, session in boulder_data.iterrows()]
-    avg_difficulties = [calculate_average_difficulty(session['climbed']) 
-                       for _, session in boulder_data.iterrows()]
+    total_climbs = boulder_data['climbed'].map(len).tolist()
+    avg_difficulties = boulder_data['climbed'].map(calculate_average_difficulty).tolist()
     
     return dates, total_climbs, avg_difficulties
 
-def create_timeline_figure(dates, total_climbs, avg_difficulties):
+def use_webgl(dates):
+    return len(dates) > WEBGL_THRESHOLD
+
+def visible_points(dates, avg_difficulties, start=None, end=None, max_points=MAX_TIMELINE_POINTS):
+    """Session indices to draw for the date window [start, end].
+
+    Windows holding more than max_points sessions are reduced with LTTB on
+    the average grade, so the shape of the colour trend is kept.
+    """
+    values = pd.DatetimeIndex(dates).asi8
+    lo = np.searchsorted(values, pd.Timestamp(start).value, side='left') if start is not None else 0
+    hi = np.searchsorted(values, pd.Timestamp(end).value, side='right') if end is not None else len(values)
+    kept = lttb(values[lo:hi], np.asarray(avg_difficulties)[lo:hi], max_points)
+    return lo + kept
+
+def _hovertext(dates, total_climbs, avg_difficulties):
+    return [f"Date: {date.strftime('%m-%d')}<br>Climbs: {count}<br>Avg Grade: V{avg:.1f}" 
+            for date, count, avg in zip(dates, total_climbs, avg_difficulties)]
+
+def timeline_patch(dates, total_climbs, avg_difficulties, indices):
+    # Replace the WebGL marker trace with the given sessions
+    dates = pd.DatetimeIndex(dates)[indices]
+    total_climbs = np.asarray(total_climbs)[indices]
+    avg_difficulties = np.asarray(avg_difficulties)[indices]
+    patch = Patch()
+    patch['data'][1]['x'] = dates
+    patch['data'][1]['marker']['size'] = (total_climbs * 5).tolist()
+    patch['data'][1]['marker']['color'] = avg_difficulties.tolist()
+    patch['data'][1]['hovertext'] = _hovertext(dates, total_climbs, avg_difficulties)
+    patch['data'][1]['customdata'] = indices.tolist()
+    patch['data'][1]['y'] = [0] * len(indices)
+    return patch
+
+def create_webgl_timeline_figure(dates, total_climbs, avg_difficulties):
+    # Same look as create_timeline_figure, drawn with WebGL from a downsampled
+    # set of sessions; customdata carries each marker's session id
+    indices = visible_points(dates, avg_difficulties)
+    fig = create_timeline_figure(
+        pd.DatetimeIndex(dates)[indices],
+        np.asarray(total_climbs)[indices].tolist(),
+        np.asarray(avg_difficulties)[indices].tolist(),
+        session_ids=indices.tolist(),
+        webgl=True
+    )
+    # The line only needs its two ends
+    fig.data[0].x = pd.DatetimeIndex(dates)[[0, -1]]
+    fig.data[0].y = [0, 0]
+    return fig
+
+def create_timeline_figure(dates, total_climbs, avg_difficulties, session_ids=None, webgl=False):
     fig = go.Figure()
+    scatter = go.Scattergl if webgl else go.Scatter
+    if session_ids is None:
+        session_ids = list(range(len(dates)))
     
     # Add timeline line
-    fig.add_trace(go.Scatter(
+    fig.add_trace(scatter(
         x=dates,
         y=[0] * len(dates),
         mode='lines',
@@ -27,10 +83,11 @@ def create_timeline_figure(dates, total_climbs, avg_difficulties):
     ))
     
     # Add scatter points
-    fig.add_trace(go.Scatter(
+    fig.add_trace(scatter(
         x=dates,
         y=[0] * len(dates),
-        mode='markers+text',
+        mode='markers' if webgl else 'markers+text',
+        customdata=session_ids,
         marker=dict(
             size=[count * 5 for count in total_climbs],
             color=avg_difficulties,
@@ -43,13 +100,13 @@ def create_timeline_figure(dates, total_climbs, avg_difficulties):
                 tickfont=dict(color='white')
             )
         ),
-        text=[f"{count} climbs<br>Avg: V{avg:.1f}" 
-              for count, avg in zip(total_climbs, avg_difficulties)],
+        # Per-marker labels are dropped in WebGL mode; hover still has them
+        text=None if webgl else [f"{count} climbs<br>Avg: V{avg:.1f}" 
+                                 for count, avg in zip(total_climbs, avg_difficulties)],
         textposition="top center",
         textfont=dict(color='white', size=12),
         hoverinfo='text',
-        hovertext=[f"Date: {date.strftime('%m-%d')}<br>Climbs: {count}<br>Avg Grade: V{avg:.1f}" 
-                   for date, count, avg in zip(dates, total_climbs, avg_difficulties)]
+        hovertext=_hovertext(dates, total_climbs, avg_difficulties)
     ))
     
     # Update layout
@@ -86,9 +143,12 @@ def create_timeline_figure(dates, total_climbs, avg_difficulties):
     
     return fig
 
-def create_graph1(data_path='climbing_results.json'):
-    dates, total_climbs, avg_difficulties = process_climbing_data(data_path)
-    fig = create_timeline_figure(dates, total_climbs, avg_difficulties)
+def create_graph1(data_path='climbing_results.json', timeline=None):
+    dates, total_climbs, avg_difficulties = timeline or timeline_data(load_boulder_data(data_path))
+    if use_webgl(dates):
+        fig = create_webgl_timeline_figure(dates, total_climbs, avg_difficulties)
+    else:
+        fig = create_timeline_figure(dates, total_climbs, avg_difficulties)
     return dcc.Graph(
         id='timeline-graph',
         figure=fig,
@@ -2,30 +2,35 @@
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-from dash import dcc
+from dash import dcc, Patch
 from calculate_session_stats import calculate_session_stats
+from accumulators import selection_stats
 
-def v_grade_to_numeric(v_grade):
-   if v_grade.startswith('V'):
-       try:
-           return int(v_grade[1:])
-       except ValueError:
-           return 0
-   return 0
+def grade_counts(climbs, min_grade, max_grade):
+   # Number of climbs at each grade from min_grade to max_grade
+   return np.bincount(np.asarray(climbs, dtype=int) - min_grade, minlength=max_grade - min_grade + 1).tolist()
 
+def session_analysis_data(boulder_data, session_ids, cube=None, accumulators=None):
+   """Everything in the session-analysis figure that depends on the selection, or None.
 
-def create_session_analysis_figure(boulder_data, session_ids):
-   selected_sessions = boulder_data[boulder_data['session_id'].isin(session_ids)]
-   if selected_sessions.empty:
-       return None
-   
-   result = calculate_session_stats(boulder_data, session_ids)
+   accumulators is a session_accumulators() dict; like the cube it answers the
+   selection by merging per-session results instead of rescanning climbs.
+   """
+   if cube is not None:
+       # Precomputed counts answer the selection without touching boulder_data
+       result = cube.stats(session_ids)
+   elif accumulators is not None:
+       result = selection_stats(accumulators, session_ids)
+   else:
+       selected_sessions = boulder_data[boulder_data['session_id'].isin(session_ids)]
+       if selected_sessions.empty:
+           return None
+       result = calculate_session_stats(boulder_data, session_ids)
    if not result:
        return None
        
    stats, completed_climbs, attempted_climbs = result
 
-   table_headers = ['Category', 'Metric', 'Value']
    table_cells = [[], [], []]
    
    for category, metrics in stats.items():
@@ -34,16 +39,48 @@ def create_session_analysis_figure(boulder_data, session_ids):
            table_cells[1].append(metric)
            table_cells[2].append(value)
 
-   fig = go.Figure()
-
-   # Add histogram for completed climbs
+   # Counts per grade are binned here, so the figure carries one bar per
+   # grade instead of one value per climb
    max_grade = max(max(completed_climbs or [0]), max(attempted_climbs or [0]))
    min_grade = min(min(completed_climbs or [0]), min(attempted_climbs or [0]))
-   
+   return {
+       'grades': list(range(min_grade, max_grade + 1)),
+       'completed': grade_counts(completed_climbs, min_grade, max_grade),
+       'attempted': grade_counts(attempted_climbs, min_grade, max_grade),
+       'table_cells': table_cells
+   }
+
+def session_analysis_patch(data):
+   """A Patch that moves a figure from create_session_analysis_figure onto new selection data.
+
+   Only the bar x/y values and the table's value column are sent; the
+   traces' styling, the table headers and the layout stay as built.
+   """
+   patch = Patch()
+   patch['data'][0]['x'] = data['grades']
+   patch['data'][0]['y'] = data['completed']
+   patch['data'][1]['x'] = data['grades']
+   patch['data'][1]['y'] = data['attempted']
+   patch['data'][2]['cells']['values'][2] = data['table_cells'][2]
+   return patch
+
+def create_session_analysis_figure(boulder_data, session_ids, cube=None, data=None, accumulators=None):
+   if data is None:
+       data = session_analysis_data(boulder_data, session_ids, cube, accumulators)
+   if data is None:
+       return None
+
+   table_headers = ['Category', 'Metric', 'Value']
+   table_cells = data['table_cells']
+   grades = data['grades']
+
+   fig = go.Figure()
+
    fig.add_trace(
-       go.Histogram(
-           x=completed_climbs,
-           nbinsx=max_grade - min_grade + 1,
+       go.Bar(
+           x=grades,
+           y=data['completed'],
+           width=1,
            name='Completed',
            xaxis='x',
            yaxis='y',
@@ -56,11 +93,11 @@ def create_session_analysis_figure(boulder_data, session_ids):
        )
    )
 
-   # Add histogram for attempted climbs
    fig.add_trace(
-       go.Histogram(
-           x=attempted_climbs,
-           nbinsx=max_grade - min_grade + 1,
+       go.Bar(
+           x=grades,
+           y=data['attempted'],
+           width=1,
            name='Attempted',
            xaxis='x',
            yaxis='y',
@@ -105,6 +142,7 @@ def create_session_analysis_figure(boulder_data, session_ids):
 
    fig.update_layout(
        barmode='stack',
+       bargap=0,
        title=dict(
            text='Climbing Session Analysis',
            font=dict(size=26, color='#1A5276', family='Arial Black'),
@@ -146,11 +184,11 @@ def create_session_analysis_figure(boulder_data, session_ids):
 
    return fig
 
-def create_graph2(boulder_data, selected_sessions=None):
+def create_graph2(boulder_data, selected_sessions=None, cube=None, data=None, accumulators=None):
    if selected_sessions is None:
        selected_sessions = range(len(boulder_data))
        
-   fig = create_session_analysis_figure(boulder_data, selected_sessions)
+   fig = create_session_analysis_figure(boulder_data, selected_sessions, cube, data, accumulators)
    
    return dcc.Graph(
        id='session-analysis-graph',
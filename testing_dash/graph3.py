@@ -2,13 +2,10 @@ import pandas as pd
 from dash import dcc, dash_table
 import json
 from datetime import datetime
-
-def calculate_average_difficulty(climbs):
-    grades = [int(climb.replace('V', '')) for climb in climbs]
-    return sum(grades) / len(grades) if grades else 0
+from utils import calculate_average_difficulty, v_grade_to_numeric
 
 def count_climbs_above_grade(climbs, threshold):
-    return sum(1 for climb in climbs if int(climb.replace('V', '')) >= threshold)
+    return sum(1 for climb in climbs if v_grade_to_numeric(climb) >= threshold)
 
 def process_data_for_table(boulder_data, session_ids):
     # Filter for selected sessions
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+from calculate_session_stats import format_session_stats
+
+SENT = 0
+ATTEMPTED = 1
+
+def _prefix(values):
+    # Running totals with a leading zero, so range [lo, hi) is prefix[hi] - prefix[lo]
+    out = np.zeros((len(values) + 1,) + values.shape[1:], dtype=np.int64 if values.dtype.kind in 'iub' else np.float64)
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+class PrefixIndex:
+    """Cumulative sums over sessions in date order.
+
+    Any contiguous run of sessions gets its grade counts, time, calories and
+    top-20 averages from two lookups and a subtraction, and a date window maps
+    to index bounds with a binary search (np.searchsorted) on the sorted dates.
+    """
+
+    def __init__(self, cube, dates):
+        dates = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[ns]')
+        self.order = np.argsort(dates, kind='stable')
+        # position[row] is the session's place in date order
+        self.position = np.empty_like(self.order)
+        self.position[self.order] = np.arange(len(self.order))
+        self.dates = dates[self.order]
+        self.grades = cube.grades
+
+        self.counts = _prefix(cube.counts[self.order])
+        self.time = _prefix(cube.time[self.order])
+        self.cal = _prefix(cube.cal[self.order])
+        # Top-20 averages are summed as exact scaled integers so ranges match a direct mean
+        self.average_scale = cube.average_scale
+        self.average_sum = _prefix(cube.session_average_scaled[self.order])
+        self.average_count = _prefix((~np.isnan(cube.session_average[self.order])).astype(np.int64))
+
+    ARRAYS = ('order', 'position', 'dates', 'counts', 'time', 'cal', 'average_sum', 'average_count')
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays, grades, average_scale):
+        index = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(index, name, arrays[name])
+        index.grades = grades
+        index.average_scale = average_scale
+        return index
+
+    def bounds(self, start, end):
+        # Date window [start, end] -> index range [lo, hi) in date order
+        lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start), 'ns'), side='left')
+        hi = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end), 'ns'), side='right')
+        return int(lo), int(hi)
+
+    def span(self, rows):
+        # (lo, hi) if rows are distinct and cover a contiguous date range, else None
+        if len(rows) == 0:
+            return None
+        positions = self.position[rows]
+        lo = positions.min()
+        hi = positions.max() + 1
+        if hi - lo != len(positions) or len(np.unique(positions)) != len(positions):
+            return None
+        return int(lo), int(hi)
+
+    def totals(self, lo, hi):
+        return self.counts[hi] - self.counts[lo]
+
+    def top20_average(self, lo, hi):
+        count = self.average_count[hi] - self.average_count[lo]
+        if count == 0:
+            return None
+        return (self.average_sum[hi] - self.average_sum[lo]) / (self.average_scale * count)
+
+    def stats(self, lo, hi, top20_average=None):
+        """Return (stats, totals) for sessions lo..hi-1 in date order, or None.
+
+        top20_average overrides the value from the prefix sums, for callers
+        that need the float mean in their own selection order.
+        """
+        if hi <= lo:
+            return None
+        totals = self.totals(lo, hi)
+        total_completed = int(totals[:, SENT].sum())
+        total_attempts = int(totals[:, ATTEMPTED].sum())
+        if total_completed + total_attempts == 0:
+            return None
+
+        num_sessions = hi - lo
+        if top20_average is None:
+            top20_average = self.top20_average(lo, hi)
+        sent_grades = np.nonzero(totals[:, SENT])[0]
+        stats = format_session_stats(
+            total_completed=total_completed,
+            total_attempts=total_attempts,
+            average_grade=(totals[:, SENT] * self.grades).sum() / total_completed if total_completed else None,
+            hardest_send=int(self.grades[sent_grades[-1]]) if total_completed else None,
+            top20_average=top20_average,
+            v6_plus=int(totals[6:, SENT].sum()),
+            num_sessions=num_sessions,
+            total_time=self.time[hi] - self.time[lo],
+            average_time=(self.time[hi] - self.time[lo]) / num_sessions,
+            total_cal=self.cal[hi] - self.cal[lo]
+        )
+        return stats, totals
@@ -0,0 +1,162 @@
+from itertools import chain
+import numpy as np
+import pandas as pd
+from utils import to_numeric
+from calculate_session_stats import format_session_stats
+from prefix_index import PrefixIndex, SENT, ATTEMPTED
+
+TOP_N = 20
+
+# Every session average is a fraction with a denominator of at most 20, so
+# scaling by lcm(1..20) makes it an exact integer that sums without drift
+AVERAGE_SCALE = 232792560
+
+def _session_averages(sends, grades):
+    """Vectorized calculate_session_average over every row of a [session, grade] send-count matrix.
+
+    Returns the averages (NaN where a session has none) and the same values
+    as exact integers scaled by AVERAGE_SCALE (0 where a session has none).
+    """
+    hard = grades > 3
+    hard_count = sends[:, hard].sum(axis=1)
+    hard_sum = (sends[:, hard] * grades[hard]).sum(axis=1)
+    total = sends.sum(axis=1)
+
+    # Top 20 by taking sends from the hardest grade down until 20 are used
+    hardest_first = sends[:, ::-1]
+    used_before = np.cumsum(hardest_first, axis=1) - hardest_first
+    take = np.clip(TOP_N - used_before, 0, hardest_first)
+    top_sum = (take * grades[::-1]).sum(axis=1)
+
+    numerator = np.where(total <= TOP_N, hard_sum, top_sum).astype(np.int64)
+    denominator = np.where(total <= TOP_N, hard_count, TOP_N).astype(np.int64)
+    # Sessions without a send above V3 have no average
+    has_average = hard_count > 0
+    denominator = np.where(has_average, denominator, 1)
+    averages = np.where(has_average, numerator / denominator, np.nan)
+    scaled = np.where(has_average, numerator * (AVERAGE_SCALE // denominator), 0)
+    return averages, scaled
+
+class SessionCube:
+    """Send and attempt counts for every session, grade and outcome.
+
+    counts has shape [session, grade, 2], where grade is the V number and the
+    last axis is SENT / ATTEMPTED. Built once from boulder_data so every
+    selection statistic is a slice and sum over the cube instead of a walk
+    over the selected rows.
+    """
+
+    def __init__(self, boulder_data):
+        self.session_ids = pd.Index(boulder_data['session_id'])
+        n = len(boulder_data)
+
+        # Grades of every climb, flattened and converted in one vectorized lookup.
+        # Lengths via fromiter so an empty frame still gives an integer array
+        sent_lengths = np.fromiter(map(len, boulder_data['climbed']), dtype=np.int64, count=n)
+        attempted_lengths = np.fromiter(map(len, boulder_data['attempted']), dtype=np.int64, count=n)
+        sent = to_numeric(list(chain.from_iterable(boulder_data['climbed']))).astype(np.int64)
+        attempted = to_numeric(list(chain.from_iterable(boulder_data['attempted']))).astype(np.int64)
+        max_grade = max(sent.max(initial=0), attempted.max(initial=0))
+        self.grades = np.arange(max_grade + 1)
+        width = len(self.grades)
+
+        # One bincount over (session, grade, outcome) cells fills the whole cube
+        cells = np.concatenate([
+            (np.repeat(np.arange(n), sent_lengths) * width + sent) * 2 + SENT,
+            (np.repeat(np.arange(n), attempted_lengths) * width + attempted) * 2 + ATTEMPTED
+        ])
+        self.counts = np.bincount(cells, minlength=n * width * 2).reshape(n, width, 2).astype(np.int32)
+
+        self.sends = self.counts[:, :, SENT].sum(axis=1)
+        self.attempts = self.counts[:, :, ATTEMPTED].sum(axis=1)
+        self.time = boulder_data['time'].to_numpy()
+        self.cal = boulder_data['cal'].to_numpy()
+        self.session_average, self.session_average_scaled = _session_averages(self.counts[:, :, SENT], self.grades)
+        self.average_scale = AVERAGE_SCALE
+        self.prefix = PrefixIndex(self, boulder_data['date'])
+
+    ARRAYS = ('session_ids', 'grades', 'counts', 'sends', 'attempts', 'time', 'cal',
+              'session_average', 'session_average_scaled')
+
+    def to_arrays(self):
+        arrays = {name: np.asarray(getattr(self, name)) for name in self.ARRAYS}
+        arrays.update({'prefix_' + name: array for name, array in self.prefix.to_arrays().items()})
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a cube around saved arrays, which may be read-only memory maps; nothing is copied."""
+        cube = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(cube, name, arrays[name])
+        cube.session_ids = pd.Index(arrays['session_ids'], copy=False)
+        cube.average_scale = AVERAGE_SCALE
+        cube.prefix = PrefixIndex.from_arrays(
+            {name[len('prefix_'):]: array for name, array in arrays.items() if name.startswith('prefix_')},
+            cube.grades, AVERAGE_SCALE)
+        return cube
+
+    def rows(self, session_ids):
+        # Cube rows for the given session ids, in order, skipping unknown ids
+        rows = self.session_ids.get_indexer(np.asarray(list(session_ids)))
+        return rows[rows >= 0]
+
+    def climbs(self, totals):
+        # Expand [grade, outcome] totals back into per-climb grade lists
+        return (np.repeat(self.grades, totals[:, SENT]).tolist(),
+                np.repeat(self.grades, totals[:, ATTEMPTED]).tolist())
+
+    def stats(self, session_ids):
+        """Same result as calculate_session_stats(boulder_data, session_ids)."""
+        session_ids = list(session_ids)
+        rows = self.rows(session_ids)
+        if len(rows) == 0:
+            return None
+
+        # Repeated ids count once in the totals but once per occurrence in the top-20 average
+        session_averages = self.session_average[rows]
+        session_averages = session_averages[~np.isnan(session_averages)]
+        top20_average = session_averages.mean() if len(session_averages) else None
+
+        # Box selections on the timeline are contiguous date ranges; unknown ids
+        # still count as sessions, so those selections take the general path
+        span = self.prefix.span(rows) if len(rows) == len(session_ids) else None
+        if span is not None:
+            return self.range_stats(*span, top20_average=top20_average)
+
+        unique_rows = np.unique(rows)
+        totals = self.counts[unique_rows].sum(axis=0)
+        total_completed = int(totals[:, SENT].sum())
+        total_attempts = int(totals[:, ATTEMPTED].sum())
+        if total_completed + total_attempts == 0:
+            return None
+
+        sent_grades = np.nonzero(totals[:, SENT])[0]
+
+        stats = format_session_stats(
+            total_completed=total_completed,
+            total_attempts=total_attempts,
+            average_grade=(totals[:, SENT] * self.grades).sum() / total_completed if total_completed else None,
+            hardest_send=int(self.grades[sent_grades[-1]]) if total_completed else None,
+            top20_average=top20_average,
+            v6_plus=int(totals[6:, SENT].sum()),
+            num_sessions=len(session_ids),
+            total_time=self.time[unique_rows].sum(),
+            average_time=self.time[unique_rows].mean(),
+            total_cal=self.cal[unique_rows].sum()
+        )
+        completed_climbs, attempted_climbs = self.climbs(totals)
+        return stats, completed_climbs, attempted_climbs
+
+    def range_stats(self, lo, hi, top20_average=None):
+        # Stats for sessions lo..hi-1 in date order, from the prefix sums
+        result = self.prefix.stats(lo, hi, top20_average)
+        if result is None:
+            return None
+        stats, totals = result
+        completed_climbs, attempted_climbs = self.climbs(totals)
+        return stats, completed_climbs, attempted_climbs
+
+    def stats_between(self, start, end):
+        """Stats for every session dated within [start, end]."""
+        return self.range_stats(*self.prefix.bounds(start, end))
@@ -0,0 +1,42 @@
+import os
+import shutil
+import fcntl
+import utils  # Puts the repository root, where session_store lives, on sys.path
+from session_store import save_arrays, load_arrays
+
+# Precomputed dashboard arrays for one version of the data file live in
+# <root>/<version>/ as .npy files written by session_store.save_arrays. Every
+# worker process memory-maps the same files read-only, so the pages are
+# shared through the OS page cache and adding workers does not add copies
+# of the data.
+
+def version_path(root, version):
+    return os.path.join(root, version)
+
+def remove_other_versions(root, version):
+    # Workers still mapping an old version keep their pages after the unlink
+    for name in os.listdir(root):
+        if name != version and not name.startswith('.'):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+def load_or_build(root, version, build):
+    """Memory-map the arrays for version, calling build() to create them if needed.
+
+    Workers map a version under a shared lock on <root>/.lock, and a build
+    and the removal of the other versions happen under an exclusive one, so
+    one of several workers starting together builds a version while the rest
+    wait, and no worker has a version deleted while it is still mapping it.
+    """
+    path = version_path(root, version)
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, '.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_SH)
+        # meta.json is written last, so a version without it was never finished
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            # Not an atomic upgrade, so check again once the lock is held
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if not os.path.exists(os.path.join(path, 'meta.json')):
+                save_arrays(path, build(), {'version': version})
+                remove_other_versions(root, version)
+        # Once mapped, the pages stay valid even if the files are removed
+        return load_arrays(path)[0]
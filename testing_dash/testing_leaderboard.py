@@ -1,44 +1,90 @@
 # leaderboard.py
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from dash import dcc
-from calculate_session_stats import calculate_session_stats
+from session_cube import SessionCube, SENT
 
-def create_session_leaderboard_figure(boulder_data, session_ids):
-    selected_sessions = boulder_data[boulder_data['session_id'].isin(session_ids)]
-    if selected_sessions.empty:
-        return None
-        
-    # Create leaderboard data
-    leaderboard_data = []
-    
-    for session_id in session_ids:
-        session = boulder_data[boulder_data['session_id'] == session_id]
-        if session.empty:
-            continue
-            
-        # Calculate stats for this single session
-        result = calculate_session_stats(boulder_data, [session_id])
-        if not result:
-            continue
-            
-        stats, completed_climbs, attempted_climbs = result
-        
-        row_data = {
-            'Session Date': session['date'].iloc[0],
-            'Duration (min)': float(stats['Session Data']['Average Duration'].replace(' min', '')),
-            'Calories': int(stats['Session Data']['Total Calories'].replace(' cal', '')),
-            'Avg Difficulty': float(stats['Performance Metrics']['Average Grade'].replace('V', '')) if stats['Performance Metrics']['Average Grade'] != 'N/A' else 0,
-            'Number of Climbs': stats['Performance Metrics']['Total Completed'],
-            'Failure Rate': float(stats['Performance Metrics']['Failure Rate'].replace('%', ''))
-        }
-        leaderboard_data.append(row_data)
-    
-    if not leaderboard_data:
+# Leaderboard columns and how each is shown; metrics stay numeric until render
+COLUMNS = {
+    'Session Date': ('date', None),
+    'Duration (min)': ('time', 1),
+    'Calories': ('cal', None),
+    'Avg Difficulty': ('avg_grade', 1),
+    'Number of Climbs': ('sends', None),
+    'Failure Rate': ('failure_rate', 1)
+}
+
+def leaderboard_metrics(boulder_data, cube=None):
+    """Per-session leaderboard metrics for every session in one vectorized pass.
+
+    Returns a DataFrame indexed like boulder_data with numeric columns;
+    sessions without any climbs have has_climbs False.
+    """
+    if cube is None:
+        cube = SessionCube(boulder_data)
+    sends = cube.sends
+    tries = sends + cube.attempts
+    grade_sum = (cube.counts[:, :, SENT] * cube.grades).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_grade = np.where(sends > 0, grade_sum / sends, 0.0)
+        failure_rate = np.where(tries > 0, cube.attempts / tries * 100, 0.0)
+    return pd.DataFrame({
+        'session_id': boulder_data['session_id'].to_numpy(),
+        'date': boulder_data['date'].to_numpy(),
+        'time': cube.time.astype(float),
+        'cal': cube.cal,
+        'avg_grade': avg_grade,
+        'sends': sends,
+        'failure_rate': failure_rate,
+        'has_climbs': tries > 0
+    })
+
+def top_sessions(metrics, by, k, ascending=False):
+    """Rows of the k best sessions by one metric, best first.
+
+    np.argpartition finds the k without sorting every session; only those k
+    are then sorted.
+    """
+    values = metrics[by].to_numpy()
+    if values.dtype.kind in 'mMb':
+        # Dates and flags cannot be negated, so rank them by their integer values
+        values = values.astype(np.int64)
+    if not ascending:
+        values = -values
+    if k < len(values):
+        picked = np.argpartition(values, k - 1)[:k]
+    else:
+        picked = np.arange(len(values))
+    picked = picked[np.argsort(values[picked], kind='stable')]
+    return metrics.iloc[picked]
+
+def format_leaderboard(rows):
+    # Rounding happens here, on the few rows that are actually shown
+    table = {}
+    for column, (field, digits) in COLUMNS.items():
+        values = rows[field].tolist()
+        table[column] = [round(value, digits) for value in values] if digits is not None else values
+    return pd.DataFrame(table)
+
+def create_session_leaderboard_figure(boulder_data, session_ids, cube=None, metrics=None, sort_by=None, top_k=None, ascending=False):
+    if metrics is None:
+        metrics = leaderboard_metrics(boulder_data, cube)
+
+    # Rows of the selected sessions in selection order, skipping unknown ids and empty sessions
+    rows = pd.Index(metrics['session_id']).get_indexer(np.asarray(list(session_ids)))
+    rows = rows[rows >= 0]
+    selected = metrics.iloc[rows]
+    selected = selected[selected['has_climbs']]
+    if selected.empty:
         return None
-        
-    # Convert to DataFrame for easier sorting
-    df = pd.DataFrame(leaderboard_data)
+
+    if sort_by is not None:
+        selected = top_sessions(selected, COLUMNS[sort_by][0], top_k or len(selected), ascending)
+    elif top_k is not None:
+        selected = selected.iloc[:top_k]
+
+    df = format_leaderboard(selected)
     
     # Create the table figure
     fig = go.Figure(data=[go.Table(
@@ -86,11 +132,11 @@ def create_session_leaderboard_figure(boulder_data, session_ids):
     
     return fig
 
-def create_leaderboard(boulder_data, selected_sessions=None):
+def create_leaderboard(boulder_data, selected_sessions=None, cube=None, sort_by=None, top_k=None):
     if selected_sessions is None:
         selected_sessions = range(len(boulder_data))
         
-    fig = create_session_leaderboard_figure(boulder_data, selected_sessions)
+    fig = create_session_leaderboard_figure(boulder_data, selected_sessions, cube, sort_by=sort_by, top_k=top_k)
     
     return dcc.Graph(
         id='session-leaderboard',
@@ -1,11 +1,11 @@
 # utils.py
-def v_grade_to_numeric(v_grade):
-    if v_grade.startswith('V'):
-        try:
-            return int(v_grade[1:])
-        except ValueError:
-            return 0
-    return 0
+import os
+import sys
+
+# The grade codec and data modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grade_codec import v_grade_to_numeric, to_numeric
 
 def count_v6_and_harder(climbed_list):
     return sum(1 for grade in climbed_list if v_grade_to_numeric(grade) >= 6)
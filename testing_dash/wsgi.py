@@ -0,0 +1,7 @@
+# Entry point for a multi-process WSGI server, e.g.
+#   gunicorn -w 4 -b 0.0.0.0:8050 wsgi:server
+# Every worker memory-maps the same precomputed session arrays.
+from app import create_app
+
+app = create_app(shared=True)
+server = app.server
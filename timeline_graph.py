@@ -3,15 +3,6 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
-# Data loading and preprocessing functions remain the same
-def v_grade_to_numeric(v_grade):
-   if v_grade.startswith('V'):
-       try:
-           return int(v_grade[1:])
-       except ValueError:
-           return 0
-   return 0
-
 # Load and process data
 climbing_data = pd.read_json('climbing_results.json')
 boulder_data = climbing_data[climbing_data['type'] == 'Boulder'].iloc[1:].reset_index(drop=True)
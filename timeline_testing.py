@@ -2,16 +2,9 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from grade_codec import v_grade_to_numeric
 
 # Data loading and processing
-def v_grade_to_numeric(v_grade):
-    if v_grade.startswith('V'):
-        try:
-            return int(v_grade[1:])
-        except ValueError:
-            return 0
-    return 0
-
 def count_v6_and_harder(climbed_list):
     return sum(1 for grade in climbed_list if v_grade_to_numeric(grade) >= 6)
 